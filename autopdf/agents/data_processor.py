@@ -1,9 +1,11 @@
 from crewai import Agent
 from langchain.tools import tool
-from unstructured.partition.auto import partition
 import io
 import re
 from bs4 import BeautifulSoup
+from core.fingerprints import fingerprint, get_fingerprint_store
+from core.metrics import timed
+from core.config import settings
 from typing import List, Dict, Any, ClassVar  # Import ClassVar
 from typing import ClassVar
 
@@ -21,6 +23,7 @@ class DataProcessorAgent(Agent):
             allow_delegation=False
         )
 
+    @timed("process")
     def process_glpi_data(self, incident_data: str, document_data: str = None, solution_data: str = None, task_data:str=None) -> dict:
         """Processes the raw data from GLPI, including document parsing."""
         try:
@@ -97,11 +100,28 @@ class DataProcessorAgent(Agent):
             document_content_bytes = eval(document_content_str)
             if isinstance(document_content_bytes, str):
                 document_content_bytes = document_content_bytes.encode('utf-8')
+            if not document_content_bytes:
+                return ""
+
+            # Partitioning is the slowest step; reuse the text of identical documents
+            store = get_fingerprint_store()
+            document_fingerprint = fingerprint(document_content_bytes)
+            cached = store.lookup(f"document:{document_fingerprint}", "partition", document_fingerprint)
+            if cached is not None:
+                return cached
+
+            # unstructured loads its document models on import; only pay for it when a document needs parsing
+            from unstructured.partition.auto import partition
+
             # Use BytesIO for in-memory file-like object
-            with io.BytesIO(document_content_bytes) as file:
+            with timed("partition"), io.BytesIO(document_content_bytes) as file:
                 elements = partition(file=file)  # Auto-detects file type
             # Concatenate text elements
-            return "\n".join([str(element) for element in elements])
+            text = "\n".join([str(element) for element in elements])
+            store.record(f"document:{document_fingerprint}", "partition", document_fingerprint, text)
+            # Rows are per document, not per incident, so bound them by age
+            store.prune("partition", settings.partition_cache_retention)
+            return text
         except Exception as e:
             print(f"Error extracting text from document: {e}")
             return ""
@@ -1,7 +1,8 @@
 from crewai import Agent
-from core.pdf_utils import create_pdf_from_text, create_pdf_from_html
+from core.pdf_utils import create_pdf_from_html
+from core.pdf_service import render_pdf
 from langchain.tools import tool
-from typing import ClassVar  # Import ClassVar
+from typing import List, Optional, ClassVar  # Import ClassVar
 from typing import ClassVar
 
 class PDFGeneratorAgent(Agent):
@@ -16,11 +17,13 @@ class PDFGeneratorAgent(Agent):
             allow_delegation=False
         )
     @tool
-    def create_pdf_from_text_tool_method(self, content: str, title: str = "Incident Report") -> bytes:
+    def create_pdf_from_text_tool_method(self, content: str, title: str = "Incident Report",
+                                         images: Optional[List[bytes]] = None) -> bytes:
         """Creates a PDF from text content.
         Args:
             content (str): The text content of the PDF.
             title (str): the title of the document (optional)
+            images (list): image attachments to preview at the end (optional)
         Returns:
             bytes: The PDF file as bytes.
         """
@@ -28,7 +31,7 @@ class PDFGeneratorAgent(Agent):
         if not content:
             raise ValueError("Content is required for PDF Generation.")
 
-        return create_pdf_from_text(content, title)
+        return render_pdf(content, title, images)
     @tool
     def create_pdf_from_html_tool_method(self, content: str, title: str = "Incident Report") -> bytes:
         """Creates a PDF from HTML content.
@@ -1,5 +1,7 @@
 from crewai import Agent
-from graphs.rag_graph import rag_app
+from graphs.rag_graph import get_rag_app
+from core.fingerprints import fingerprint, get_fingerprint_store
+from core.metrics import timed
 from typing import ClassVar  # Import ClassVar
 from typing import ClassVar
 
@@ -23,5 +25,25 @@ class QueryHandlerAgent(Agent):
             "processed_data": processed_data,
             "query": f"Summarize the incident and its resolution, including any relevant information from past incidents related to {processed_data.get('incident_type', 'this topic')}.",
         }
-        result = rag_app.invoke(inputs)
+        # Skip the LLM when the fields that feed the prompt are unchanged
+        store = get_fingerprint_store()
+        incident_id = processed_data.get('incident_id')
+        rag_fingerprint = fingerprint(
+            processed_data.get('name'),
+            processed_data.get('content'),
+            processed_data.get('solution'),
+            [(task.get('id'), task.get('content')) for task in processed_data.get('tasks', [])],
+            fingerprint(processed_data.get('document_content', '')),
+            inputs['query'],
+        )
+        if incident_id is not None:
+            cached = store.lookup(incident_id, "generate", rag_fingerprint)
+            if cached is not None:
+                print(f"Incident {incident_id}: report inputs unchanged, reusing generated content.")
+                return cached
+
+        with timed("generate"):
+            result = get_rag_app().invoke(inputs)
+        if incident_id is not None:
+            store.record(incident_id, "generate", rag_fingerprint, result['generated_content'])
         return result['generated_content']
@@ -1,6 +1,10 @@
 from crewai import Agent
-from core.meilisearch_client import MeilisearchClient
-from core.wasabi_client import WasabiClient
+from core.meilisearch_client import get_meilisearch_client, INCIDENT_FILTERABLE_ATTRIBUTES, date_day
+from core.search_index import publish, sync_status
+from core.wasabi_client import get_wasabi_client
+from core.manifest import get_manifest_index
+from core.fingerprints import fingerprint, get_fingerprint_store
+from core.metrics import timed
 from core.config import settings
 import hashlib
 from langchain.tools import tool
@@ -8,9 +12,6 @@ from typing import Dict, ClassVar  # Import ClassVar
 from datetime import datetime
 from typing import ClassVar
 
-meilisearch_client = MeilisearchClient()
-wasabi_client = WasabiClient()
-
 
 class SearchIndexerAgent(Agent):
     def __init__(self) -> None:
@@ -23,11 +24,30 @@ class SearchIndexerAgent(Agent):
             verbose=True,
             allow_delegation=False
         )
+    @timed("store")
     def index_and_store_pdf(self, pdf_content: bytes, processed_data: Dict) -> str:
         """Stores the PDF in Wasabi, indexes it in Meilisearch, and handles versioning."""
 
         incident_id = processed_data['incident_id']
         incident_type = processed_data['incident_type']
+
+        # Don't store and index a new version whose PDF and report fields are unchanged.
+        # Status is indexed but left out here, like in the ticket fingerprint, so
+        # status-only updates don't add a version.
+        store = get_fingerprint_store()
+        store_fingerprint = fingerprint(
+            pdf_content,
+            incident_type,
+            processed_data.get('generated_content', ''),
+            processed_data.get('solution', ''),
+            processed_data.get('tasks', []),
+            processed_data.get('date', ''),
+            processed_data.get('name', ''),
+        )
+        cached = store.lookup(incident_id, "store", store_fingerprint)
+        if cached is not None:
+            sync_status(incident_id, processed_data.get('status'))
+            return cached
         # Use a timestamp for versioning, along with the hash.
         now = datetime.now().strftime("%Y%m%d_%H%M%S")
         content_hash = hashlib.sha256(pdf_content).hexdigest()
@@ -37,30 +57,40 @@ class SearchIndexerAgent(Agent):
 
 
         # Check if the document already exists (using the new naming)
+        wasabi_client = get_wasabi_client()
         if wasabi_client.document_exists(settings.bucket_name, object_name):
             return f"Document with identical content and timestamp already exists: {object_name}"
 
         # Upload to Wasabi
+        print(f"Storing {object_name} ({len(pdf_content) / 1024:.1f} KiB)")
         wasabi_client.upload_document(settings.bucket_name, object_name, pdf_content)
+        get_manifest_index().record(object_name, size=len(pdf_content))
 
         # Create index if it doesn't exist
+        meilisearch_client = get_meilisearch_client()
         meilisearch_client.create_index("glpi_incidents")
+        meilisearch_client.ensure_filterable("glpi_incidents", INCIDENT_FILTERABLE_ATTRIBUTES)
 
         # Prepare document for Meilisearch
         index_document = {
             'id': f"{incident_id}-{version_string}",  # Unique ID
             'incident_id': incident_id,
             'incident_type': incident_type,
+            'status': processed_data.get('status'),
             'version': version_string,
             'object_name': object_name,
             'content': processed_data.get('generated_content', ''),  # Include summary
             'solution': processed_data.get('solution', ''),
             'tasks': processed_data.get('tasks', []),
             'date': processed_data.get('date', ''),
+            'date_day': date_day(processed_data.get('date')),  # numeric, for date-range filters
             'name': processed_data.get('name', ''),
             'updated_at': now,  # Add an updated_at timestamp
+            'pdf_size': len(pdf_content),  # Bytes stored in Wasabi for this version
         }
 
-        # Index in Meilisearch
-        meilisearch_client.index_document("glpi_incidents", index_document)
-        return f"PDF stored and indexed: {object_name}"
+        # Index in Meilisearch; cached /search results predate this version
+        publish(meilisearch_client.index_document("glpi_incidents", index_document))
+        message = f"PDF stored and indexed: {object_name}"
+        store.record(incident_id, "store", store_fingerprint, message)
+        return message
@@ -0,0 +1,222 @@
+"""End-to-end benchmark of the AutoPDF pipeline against local fakes.
+
+GLPI, Meilisearch and the LLM are replaced by the stubs in `benchmarks.fakes`
+and Wasabi by moto's S3 server, so runs are repeatable and cost nothing.
+Every run writes a trace, from which per-stage latency percentiles are
+computed; the summary also reports end-to-end throughput and latency, and
+how many GLPI sessions were opened and requests rejected with 401. Each
+pipeline thread and queue worker has its own GLPI client, so rejections
+mean runs are closing each other's sessions.
+
+Run from the autopdf directory (needs `pip install -r benchmarks/requirements.txt`):
+
+    python -m benchmarks.bench_e2e --mode pipeline --incidents 20 --concurrency 4
+    python -m benchmarks.bench_e2e --mode webhook --incidents 50 --concurrency 8 --llm-latency 1.0
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from benchmarks.fakes import (
+    ServerThread, create_glpi_app, create_meilisearch_app, create_openai_app, start_s3,
+)
+
+_PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def start_fakes(args: argparse.Namespace) -> List:
+    """Starts the stand-ins and points AutoPDF's settings at them via the environment.
+
+    Must run before anything from `core`, `agents` or `main` is imported,
+    since the settings and clients are created at import time.
+    """
+    servers = [
+        ServerThread(create_glpi_app(latency=args.glpi_latency)).start(),
+        ServerThread(create_meilisearch_app()).start(),
+        ServerThread(create_openai_app(latency_p50=args.llm_latency, latency_sigma=args.llm_sigma)).start(),
+    ]
+    s3 = start_s3()
+    glpi, meilisearch, llm = servers
+
+    data_dir = tempfile.mkdtemp(prefix="autopdf-bench-")
+    os.environ.update({
+        "GLPI_URL": glpi.url,
+        "GLPI_APP_TOKEN": "bench",
+        "GLPI_USER_TOKEN": "bench",
+        "MEILISEARCH_URL": meilisearch.url,
+        "MEILISEARCH_MASTER_KEY": "bench",
+        "WASABI_ENDPOINT": s3.url,
+        "WASABI_ACCESS_KEY": "bench",
+        "WASABI_SECRET_KEY": "bench",
+        "AWS_DEFAULT_REGION": "ap-northeast-1",
+        "BUCKET_NAME": "autopdf-bench",
+        "OPENAI_API_BASE": llm.url,
+        "OPENAI_API_KEY": "bench",
+        "MANIFEST_DB_PATH": os.path.join(data_dir, "manifest.db"),
+        "FINGERPRINT_DB_PATH": os.path.join(data_dir, "fingerprints.db"),
+        "QUEUE_DB_PATH": os.path.join(data_dir, "jobs.db"),
+        "BLOB_CACHE_DIR": os.path.join(data_dir, "blob_cache"),
+        "TRACE_DIR": os.path.join(data_dir, "traces"),
+        "METRICS_DIR": os.path.join(data_dir, "metrics"),
+        "SEARCH_GENERATION_PATH": os.path.join(data_dir, "search_generation"),
+        "TRACE_SLOW_RUN_SECONDS": "0",  # keep a trace of every run
+        "QUEUE_WORKER_THREADS": str(args.concurrency if args.mode == "webhook" else 0),
+        "QUEUE_POLL_INTERVAL": "0.05",
+        "QUEUE_RETRY_BASE_DELAY": "1",
+    })
+    print(f"Fakes: GLPI {glpi.url}, Meilisearch {meilisearch.url}, LLM {llm.url}, S3 {s3.url}")
+    print(f"Benchmark data in {data_dir}")
+    return servers + [s3]
+
+
+def incident_ids(args: argparse.Namespace) -> List[int]:
+    if args.repeat_same:
+        return [args.first_incident] * args.incidents
+    return list(range(args.first_incident, args.first_incident + args.incidents))
+
+
+def run_pipeline(ids: List[int], concurrency: int) -> Dict:
+    """Calls `run_autopdf` directly from a thread pool."""
+    import main
+
+    def run_one(incident_id: int) -> Optional[str]:
+        try:
+            main.run_autopdf(incident_id)
+            return None
+        except Exception as e:
+            return f"{incident_id}: {e}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        errors = [error for error in pool.map(run_one, ids) if error]
+    return {"wall": time.perf_counter() - start, "errors": errors}
+
+
+def run_webhook(ids: List[int], batch_size: int, timeout: float) -> Dict:
+    """Posts GLPI events to `/webhook` and waits for the queue workers to drain them."""
+    import httpx
+    import main
+
+    server = ServerThread(main.app).start()
+    try:
+        start = time.perf_counter()
+        with httpx.Client(base_url=server.url, timeout=30) as client:
+            for i in range(0, len(ids), batch_size):
+                events = [{"event": "add", "itemtype": "Ticket", "items_id": incident_id}
+                          for incident_id in ids[i:i + batch_size]]
+                client.post("/webhook", json=events).raise_for_status()
+            while True:
+                status = client.get("/queue").json()
+                counts = status["counts"]
+                if counts["queued"] == 0 and counts["leased"] == 0:
+                    break
+                if time.perf_counter() - start > timeout:
+                    print(f"Timed out waiting for the queue: {counts}")
+                    break
+                time.sleep(0.1)
+        wall = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    errors = [f"{job['incident_id']}: {job['last_error']}" for job in status["dead_letters"]]
+    return {"wall": wall, "errors": errors, "queue_latencies": queue_latencies()}
+
+
+def queue_latencies() -> List[float]:
+    """Enqueue-to-done time of every finished job, from the job store."""
+    conn = sqlite3.connect(os.environ["QUEUE_DB_PATH"])
+    try:
+        rows = conn.execute("SELECT created_at, updated_at FROM jobs WHERE status = 'done'").fetchall()
+    finally:
+        conn.close()
+    return [(datetime.fromisoformat(done) - datetime.fromisoformat(created)).total_seconds()
+            for created, done in rows]
+
+
+def load_traces() -> List[Dict]:
+    traces = []
+    for path in glob.glob(os.path.join(os.environ["TRACE_DIR"], "*.json")):
+        with open(path) as file:
+            traces.append(json.load(file))
+    return traces
+
+
+def report(result: Dict, traces: List[Dict], runs: int, glpi_state) -> None:
+    stage_durations: Dict[str, List[float]] = {}
+    for trace in traces:
+        for span in trace["spans"]:
+            if span["duration"] is not None:
+                stage_durations.setdefault(span["name"], []).append(span["duration"])
+
+    print()
+    print(f"{'stage':<14} {'count':>6} " + " ".join(f"{'p' + str(p) + '_ms':>9}" for p in _PERCENTILES)
+          + f" {'mean_ms':>9}")
+    for name, durations in sorted(stage_durations.items(), key=lambda item: -sum(item[1])):
+        print(f"{name:<14} {len(durations):>6} "
+              + " ".join(f"{1000 * percentile(durations, p):>9.1f}" for p in _PERCENTILES)
+              + f" {1000 * sum(durations) / len(durations):>9.1f}")
+
+    end_to_end = [trace["duration"] for trace in traces]
+    print()
+    print(f"runs: {runs}, traced: {len(traces)}, errors: {len(result['errors'])}, wall: {result['wall']:.2f}s, "
+          f"throughput: {runs / result['wall']:.2f} runs/s")
+    if end_to_end:
+        print("pipeline latency: " + ", ".join(
+            f"p{p} {percentile(end_to_end, p):.3f}s" for p in _PERCENTILES))
+    if result.get("queue_latencies"):
+        print("enqueue-to-done latency: " + ", ".join(
+            f"p{p} {percentile(result['queue_latencies'], p):.3f}s" for p in _PERCENTILES))
+    print(f"GLPI sessions opened: {glpi_state.sessions_opened}, requests rejected (401): {glpi_state.rejected}")
+    for error in result["errors"][:10]:
+        print(f"  error {error}")
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["pipeline", "webhook"], default="pipeline")
+    parser.add_argument("--incidents", type=int, default=10, help="number of runs / events")
+    parser.add_argument("--concurrency", type=int, default=4, help="threads (pipeline) or queue workers (webhook)")
+    parser.add_argument("--first-incident", type=int, default=1000)
+    parser.add_argument("--repeat-same", action="store_true",
+                        help="use one incident for every run to measure the unchanged-ticket path")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="median fake LLM latency in seconds")
+    parser.add_argument("--llm-sigma", type=float, default=0.6, help="log-normal spread of the LLM latency")
+    parser.add_argument("--glpi-latency", type=float, default=0.01, help="fake GLPI latency per request in seconds")
+    parser.add_argument("--batch-size", type=int, default=10, help="events per webhook request")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds to wait for the queue to drain")
+    parser.add_argument("--fail-on-errors", action="store_true",
+                        help="exit non-zero if any run failed or GLPI rejected a session")
+    args = parser.parse_args(argv)
+
+    servers = start_fakes(args)
+    try:
+        ids = incident_ids(args)
+        if args.mode == "pipeline":
+            result = run_pipeline(ids, args.concurrency)
+        else:
+            result = run_webhook(ids, args.batch_size, args.timeout)
+        glpi_state = servers[0].app.state
+        report(result, load_traces(), len(ids), glpi_state)
+    finally:
+        for server in servers:
+            server.stop()
+    return 1 if args.fail_on_errors and (result["errors"] or glpi_state.rejected) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,328 @@
+"""Local stand-ins for GLPI, Meilisearch, S3 and the LLM used by the benchmarks.
+
+Each fake is a small FastAPI app (S3 is served by moto) started on a free
+localhost port in a background thread. Only the endpoints AutoPDF calls are
+implemented, with just enough behaviour to keep the clients happy.
+"""
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Runs an ASGI app with uvicorn in a daemon thread."""
+
+    def __init__(self, app, port: Optional[int] = None) -> None:
+        self.app = app
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+_PHRASES = [
+    "Users in building {n} report that the internet connection drops every few minutes.",
+    "The print queue on PRN-{n} is stuck and jobs stay queued.",
+    "A password reset is required after the account was locked following failed login attempts.",
+    "The accounting application fails to install on laptop LT-{n} with error 1603.",
+    "VPN connection to the head office times out during the morning peak.",
+]
+
+
+def synthetic_ticket(ticket_id: int) -> Dict:
+    rng = random.Random(ticket_id)
+    paragraphs = [rng.choice(_PHRASES).format(n=ticket_id) for _ in range(rng.randint(2, 6))]
+    return {
+        "id": ticket_id,
+        "name": f"Incident {ticket_id}: {paragraphs[0][:60]}",
+        "content": "".join(f"<p>{p}</p>" for p in paragraphs),
+        "status": "Processing (assigned)",
+        "priority": rng.randint(1, 5),
+        "urgency": rng.randint(1, 5),
+        "impact": rng.randint(1, 5),
+        "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:00:00",
+        "solvedate": None,
+        "users_id_recipient": rng.randint(2, 50),
+    }
+
+
+def create_glpi_app(latency: float = 0.0, document_bytes: int = 20_000) -> FastAPI:
+    """GLPI REST API stub serving deterministic synthetic tickets, tasks and documents.
+
+    `app.state.sessions_opened` and `app.state.rejected` count sessions and
+    requests refused with 401, so session churn between workers shows up.
+    """
+    app = FastAPI()
+    app.state.sessions_opened = 0
+    app.state.rejected = 0
+    solutions: Dict[int, List[Dict]] = {}
+    sessions = set()
+
+    async def pause() -> None:
+        if latency:
+            import asyncio
+            await asyncio.sleep(latency)
+
+    def check_session(token: Optional[str]) -> None:
+        if token not in sessions:
+            app.state.rejected += 1
+            raise HTTPException(status_code=401, detail="ERROR_SESSION_TOKEN_INVALID")
+
+    @app.get("/initSession")
+    async def init_session():
+        await pause()
+        token = uuid.uuid4().hex
+        sessions.add(token)
+        app.state.sessions_opened += 1
+        return {"session_token": token}
+
+    @app.get("/killSession")
+    async def kill_session(session_token: Optional[str] = Header(None)):
+        sessions.discard(session_token)
+        return []
+
+    @app.get("/Ticket/{ticket_id}")
+    async def get_ticket(ticket_id: int, session_token: Optional[str] = Header(None)):
+        check_session(session_token)
+        await pause()
+        return synthetic_ticket(ticket_id)
+
+    @app.get("/Ticket/{ticket_id}/ITILSolution")
+    async def get_solutions(ticket_id: int, session_token: Optional[str] = Header(None)):
+        check_session(session_token)
+        await pause()
+        return solutions.get(ticket_id, [])
+
+    @app.post("/Ticket/{ticket_id}/ITILSolution")
+    async def add_solution(ticket_id: int, request: Request, session_token: Optional[str] = Header(None)):
+        check_session(session_token)
+        body = await request.json()
+        items = solutions.setdefault(ticket_id, [])
+        items.append({"id": len(items) + 1, "content": body["input"]["content"]})
+        return {"id": items[-1]["id"], "message": ""}
+
+    @app.put("/Ticket/{ticket_id}/ITILSolution/{solution_id}")
+    async def update_solution(ticket_id: int, solution_id: int, request: Request,
+                              session_token: Optional[str] = Header(None)):
+        check_session(session_token)
+        body = await request.json()
+        for item in solutions.get(ticket_id, []):
+            if item["id"] == solution_id:
+                item["content"] = body["input"]["content"]
+        return []
+
+    @app.get("/Ticket/{ticket_id}/ITILTask")
+    async def get_tasks(ticket_id: int, session_token: Optional[str] = Header(None)):
+        check_session(session_token)
+        await pause()
+        rng = random.Random(ticket_id * 7)
+        return [
+            {"id": ticket_id * 100 + i, "content": f"<p>Step {i}: {rng.choice(_PHRASES).format(n=i)}</p>",
+             "state": 2, "users_id": rng.randint(2, 50)}
+            for i in range(rng.randint(1, 4))
+        ]
+
+    @app.get("/Ticket/{ticket_id}/Document_Item")
+    async def get_document_items(ticket_id: int, session_token: Optional[str] = Header(None)):
+        check_session(session_token)
+        await pause()
+        return [{"id": ticket_id, "documents_id": 12345, "itemtype": "Ticket", "items_id": ticket_id}]
+
+    @app.get("/Document/{document_id}")
+    async def get_document(document_id: int, session_token: Optional[str] = Header(None)):
+        check_session(session_token)
+        await pause()
+        return {"id": document_id, "filename": f"doc-{document_id}.txt",
+                "filepath": f"files/{document_id}.txt", "sha1sum": f"{document_id:040x}"}
+
+    @app.get("/files/{document_id}.txt")
+    async def download(document_id: int):
+        await pause()
+        line = f"Log excerpt for document {document_id}: interface flapped, CRC errors observed.\n"
+        body = (line * (document_bytes // len(line) + 1))[:document_bytes]
+        return Response(body.encode("utf-8"), media_type="text/plain")
+
+    return app
+
+
+def create_meilisearch_app() -> FastAPI:
+    """In-memory Meilisearch stub: indexes, document add/update/fetch, naive search with
+    facets and the `IN [...]` / `!=` filters that `/search` generates."""
+    app = FastAPI()
+    indexes: Dict[str, Dict[str, Dict]] = {}
+    task_counter = iter(range(1, 10**9))
+
+    def task(index_uid: str, kind: str) -> Dict:
+        return {"taskUid": next(task_counter), "indexUid": index_uid, "status": "enqueued",
+                "type": kind, "enqueuedAt": datetime.now(timezone.utc).isoformat()}
+
+    def project(document: Dict, fields: Optional[List[str]]) -> Dict:
+        if not fields or fields == ["*"]:
+            return document
+        return {key: value for key, value in document.items() if key in fields}
+
+    @app.post("/indexes")
+    async def create_index(request: Request):
+        body = await request.json()
+        if body["uid"] in indexes:
+            return Response(status_code=400, media_type="application/json",
+                            content='{"message":"Index already exists.","code":"index_already_exists",'
+                                    '"type":"invalid_request","link":""}')
+        indexes[body["uid"]] = {}
+        return task(body["uid"], "indexCreation")
+
+    @app.delete("/indexes/{uid}")
+    async def delete_index(uid: str):
+        indexes.pop(uid, None)
+        return task(uid, "indexDeletion")
+
+    @app.post("/indexes/{uid}/documents")
+    @app.put("/indexes/{uid}/documents")
+    async def add_documents(uid: str, request: Request):
+        documents = indexes.setdefault(uid, {})
+        for document in await request.json():
+            documents.setdefault(str(document["id"]), {}).update(document)
+        return task(uid, "documentAdditionOrUpdate")
+
+    @app.post("/indexes/{uid}/documents/fetch")
+    async def fetch_documents(uid: str, request: Request):
+        body = await request.json()
+        return _page(uid, body.get("offset", 0), body.get("limit", 20), body.get("fields"))
+
+    @app.get("/indexes/{uid}/documents")
+    async def list_documents(uid: str, offset: int = 0, limit: int = 20, fields: Optional[str] = None):
+        return _page(uid, offset, limit, fields.split(",") if fields else None)
+
+    def _page(uid: str, offset: int, limit: int, fields: Optional[List[str]]) -> Dict:
+        documents = list(indexes.get(uid, {}).values())
+        return {"results": [project(d, fields) for d in documents[offset:offset + limit]],
+                "offset": offset, "limit": limit, "total": len(documents)}
+
+    @app.get("/indexes/{uid}/documents/{document_id}")
+    async def get_document(uid: str, document_id: str):
+        document = indexes.get(uid, {}).get(document_id)
+        if document is None:
+            return Response(status_code=404, media_type="application/json",
+                            content='{"message":"Document not found.","code":"document_not_found",'
+                                    '"type":"invalid_request","link":""}')
+        return document
+
+    @app.put("/indexes/{uid}/settings/filterable-attributes")
+    async def update_filterable_attributes(uid: str):
+        return task(uid, "settingsUpdate")
+
+    def matches(document: Dict, expression: Optional[str]) -> bool:
+        for clause in (expression or "").split(" AND "):
+            clause = clause.strip()
+            if not clause:
+                continue
+            name, operator, value = re.match(r"(\w+) (IN|!=) (.+)", clause).groups()
+            if operator == "IN":
+                if str(document.get(name)) not in [str(v) for v in json.loads(value)]:
+                    return False
+            elif str(document.get(name)) == value:
+                return False
+        return True
+
+    @app.post("/indexes/{uid}/search")
+    async def search(uid: str, request: Request):
+        body = await request.json()
+        started = time.perf_counter()
+        terms = [term for term in (body.get("q") or "").lower().split() if len(term) > 3]
+        limit, offset = body.get("limit", 20), body.get("offset", 0)
+        scored = []
+        for document in indexes.get(uid, {}).values():
+            if not matches(document, body.get("filter")):
+                continue
+            text = " ".join(str(value) for value in document.values()).lower()
+            score = sum(term in text for term in terms) if terms else 1
+            if score:
+                scored.append((score, document))
+        scored.sort(key=lambda item: -item[0])
+        hits = [project(d, body.get("attributesToRetrieve")) for _, d in scored[offset:offset + limit]]
+        facets = {}
+        for name in body.get("facets") or []:
+            counts = facets.setdefault(name, {})
+            for _, document in scored:
+                if document.get(name) is not None:
+                    counts[str(document[name])] = counts.get(str(document[name]), 0) + 1
+        return {"hits": hits, "facetDistribution": facets, "query": body.get("q") or "", "limit": limit, "offset": offset,
+                "estimatedTotalHits": len(scored),
+                "processingTimeMs": int((time.perf_counter() - started) * 1000)}
+
+    return app
+
+
+def create_openai_app(latency_p50: float = 0.5, latency_sigma: float = 0.6, seed: int = 0) -> FastAPI:
+    """OpenAI-compatible /chat/completions with log-normal latency (median `latency_p50`)."""
+    import asyncio
+    import math
+
+    app = FastAPI()
+    rng = random.Random(seed)
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        delay = latency_p50 * math.exp(rng.gauss(0, latency_sigma)) if latency_p50 > 0 else 0
+        await asyncio.sleep(delay)
+        prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+        content = (
+            "## Incident description\n\nThe reported connectivity issue was investigated.\n\n"
+            "## Resolution steps\n\n- Checked the uplink\n- Replaced the faulty optic\n\n"
+            "## Root cause\n\nA failing SFP module caused CRC errors.\n\n"
+            "## Key learnings\n\nLower the CRC alert threshold.\n"
+        )
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    return app
+
+
+def start_s3() -> "object":
+    """Starts moto's S3 server; returns the server object (with `.url`)."""
+    from moto.server import ThreadedMotoServer
+
+    port = free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    server.url = f"http://127.0.0.1:{port}"
+    return server
@@ -1,16 +1,49 @@
-from .glpi import GLPIClient
-from .meilisearch_client import MeilisearchClient
-from .wasabi_client import WasabiClient
-from .pdf_utils import create_pdf_from_text, create_pdf_from_html
-from .config import settings
-from .llm_utils import generate_text
+import importlib
+
+# Attributes are resolved on first access, so `from core.config import settings`
+# doesn't drag in boto3, reportlab, meilisearch and langchain.
+_exports = {
+    "GLPIClient": ".glpi",
+    "MeilisearchClient": ".meilisearch_client",
+    "WasabiClient": ".wasabi_client",
+    "ManifestIndex": ".manifest",
+    "BlobCache": ".blob_cache",
+    "FingerprintStore": ".fingerprints",
+    "fingerprint": ".fingerprints",
+    "JobQueue": ".job_queue",
+    "JobWorker": ".job_queue",
+    "SearchCache": ".search_cache",
+    "create_pdf_from_text": ".pdf_utils",
+    "create_pdf_from_html": ".pdf_utils",
+    "settings": ".config",
+    "generate_text": ".llm_utils",
+}
 
 __all__ = [
     "GLPIClient",
     "MeilisearchClient",
     "WasabiClient",
+    "ManifestIndex",
+    "BlobCache",
+    "FingerprintStore",
+    "fingerprint",
+    "JobQueue",
+    "JobWorker",
+    "SearchCache",
     "create_pdf_from_text",
     "create_pdf_from_html",
     "settings",
     "generate_text"
 ]
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from core.config import settings
+from core.metrics import record_cache
+from typing import Callable, Dict, Optional
+
+
+class BlobCache:
+    """Size-bounded on-disk LRU cache for objects fetched from Wasabi.
+
+    Entries are plain files named by the hash of their key, so the cache can
+    be served with sendfile/range requests and survives process restarts.
+    """
+
+    # Checked-out links older than this are from responses that never finished
+    CHECKOUT_MAX_AGE = 3600.0
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        self.cache_dir: str = cache_dir or settings.blob_cache_dir
+        self.max_bytes: int = max_bytes if max_bytes is not None else settings.blob_cache_max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes: int = 0
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        """Rebuilds the LRU order from files left by a previous process."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".serving"):
+                self._remove_stale_checkout(os.path.join(self.cache_dir, name))
+                continue
+            if not name.endswith(".blob"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _filename(self, key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".blob"
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the local path for a cached key and marks it recently used.
+
+        The directory is shared by the worker processes on the host, so a file
+        another process stored is taken over here rather than downloaded again.
+        """
+        name = self._filename(key)
+        path = os.path.join(self.cache_dir, name)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:  # never stored, or evicted by another worker process
+            with self._lock:
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = size
+                self._total_bytes += size
+                self._evict()
+            self._entries.move_to_end(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, key: str, loader: Callable[[str], None]) -> str:
+        """Returns the cached path for `key`, calling `loader(tmp_path)` on a miss.
+
+        Concurrent misses for the same key are collapsed into one load.
+        """
+        path = self.get(key)
+        record_cache("blob", path is not None)
+        if path:
+            return path
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self.get(key)
+            if path:
+                return path
+            try:
+                return self._store(key, loader)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def checkout(self, key: str, loader: Callable[[str], None]) -> str:
+        """Like `fetch`, but returns a private hard link the caller deletes when done.
+
+        Eviction, here or in another worker process, only unlinks the cache's
+        own name, so a response still being sent from the link keeps its data.
+        """
+        for _ in range(3):
+            path = self.fetch(key, loader)
+            # The link shares the entry's inode and mtime, so its age goes in the name
+            link = f"{path}.{int(time.time())}_{uuid.uuid4().hex[:8]}.serving"
+            try:
+                os.link(path, link)
+                return link
+            except FileNotFoundError:  # evicted between fetch and link; fetch again
+                continue
+        raise FileNotFoundError(f"Blob for {key!r} was evicted while being checked out")
+
+    def _remove_stale_checkout(self, path: str) -> None:
+        try:
+            created = int(path.rsplit(".", 2)[1].split("_")[0])
+        except (IndexError, ValueError):
+            created = 0
+        if created < time.time() - self.CHECKOUT_MAX_AGE:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _store(self, key: str, loader: Callable[[str], None]) -> str:
+        name = self._filename(key)
+        path = os.path.join(self.cache_dir, name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        os.close(fd)
+        try:
+            loader(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes -= self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._total_bytes += size
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until under budget (keeps the newest)."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
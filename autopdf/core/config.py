@@ -2,6 +2,7 @@ import os
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Optional
 
 
 load_dotenv()
@@ -20,5 +21,57 @@ class Settings(BaseSettings):
     model_name: str = "DeepSeek-R1"
     bucket_name: str = "rapidwrite"
     max_rag_iterations: int = 3
+    manifest_db_path: str = "data/manifest.db"
+    fingerprint_db_path: str = "data/fingerprints.db"
+    partition_cache_retention: float = 30 * 24 * 3600.0  # seconds extracted document text is reused for
+    queue_db_path: str = "data/jobs.db"
+    queue_visibility_timeout: float = 600.0
+    queue_max_attempts: int = 5
+    queue_retry_base_delay: float = 30.0
+    queue_retry_max_delay: float = 1800.0
+    queue_poll_interval: float = 2.0
+    queue_done_retention: float = 7 * 24 * 3600.0  # seconds finished jobs are kept for /queue and debugging
+    queue_purge_interval: float = 3600.0  # how often each idle worker deletes older finished jobs
+    queue_worker_threads: int = 1  # consumers per API process; 0 to run only `python worker.py`
+    warm_up_on_startup: bool = False  # load agents, clients and fonts before consuming jobs
+    glpi_timeout: float = 30.0
+    glpi_max_concurrency: int = 8
+    llm_max_concurrency: int = 4
+    llm_tokens_per_minute: int = 60000  # 0 disables the LLM token budget
+    llm_request_timeout: float = 300.0
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 95.0  # hedge once the primary is slower than this
+    llm_hedge_max_rate: float = 0.1  # at most this fraction of requests are hedged
+    llm_hedge_min_samples: int = 20
+    llm_hedge_model: Optional[str] = None  # defaults to the primary model
+    llm_hedge_api_base: Optional[str] = None  # defaults to openai_api_base
+    meilisearch_max_concurrency: int = 16
+    meilisearch_task_timeout: float = 10.0  # seconds to wait for an indexing task before moving on
+    wasabi_max_concurrency: int = 16
+    resilience_max_attempts: int = 3
+    resilience_backoff_base: float = 0.5
+    resilience_backoff_max: float = 10.0
+    resilience_acquire_timeout: float = 60.0
+    limiter_latency_tolerance: float = 3.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    trace_dir: str = "data/traces"
+    metrics_dir: str = "data/metrics"  # per-process snapshots merged by /metrics; empty serves one process only
+    metrics_flush_interval: float = 5.0
+    trace_slow_run_seconds: float = 120.0  # dump a JSON trace for runs at least this slow; -1 disables
+    presigned_url_ttl: int = 3600
+    blob_cache_dir: str = "data/blob_cache"
+    blob_cache_max_bytes: int = 1024 * 1024 * 1024
+    search_cache_ttl: float = 30.0  # seconds; 0 disables the search result cache
+    search_cache_max_entries: int = 1000
+    search_generation_path: str = "data/search_generation"
+    search_max_limit: int = 100
+    pdf_render_workers: int = 2
+    pdf_font_path: Optional[str] = None
+    pdf_font_name: str = "ReportFont"
+    pdf_profile: str = "compact"  # "compact" or "default"
+    pdf_image_dpi: int = 150
+    pdf_image_quality: int = 75
+    pdf_max_images: int = 10  # image attachments previewed per report; 0 disables
 
 settings = Settings()
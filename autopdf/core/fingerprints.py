@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from core.config import settings
+from core.metrics import record_cache
+from typing import Any, Optional, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_runs (
+    scope        TEXT NOT NULL,
+    stage        TEXT NOT NULL,
+    fingerprint  TEXT NOT NULL,
+    output_text  TEXT,
+    output_blob  BLOB,
+    updated_at   TEXT NOT NULL,
+    PRIMARY KEY (scope, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_stage_runs_age ON stage_runs (stage, updated_at);
+"""
+
+# Run once per database, tracked with PRAGMA user_version
+_MIGRATIONS = [
+    # Rendered PDFs were cached here once; the store stage's own fingerprint covers them
+    "DELETE FROM stage_runs WHERE stage = 'render'",
+]
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable SHA-256 over JSON-serialisable parts (bytes are hashed first)."""
+    normalised = [
+        {"sha256": hashlib.sha256(part).hexdigest()} if isinstance(part, (bytes, bytearray)) else part
+        for part in parts
+    ]
+    payload = json.dumps(normalised, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    """Remembers the input fingerprint and output of each stage's last successful run.
+
+    A stage looks up its current fingerprint before doing any work; a hit
+    returns the previous output so unchanged inputs skip the stage entirely.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.db_path: str = db_path or settings.fingerprint_db_path
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for statement in _MIGRATIONS[version:]:
+                self._conn.execute(statement)
+            self._conn.execute(f"PRAGMA user_version = {len(_MIGRATIONS)}")
+
+    def lookup(self, scope: Any, stage: str, current: str) -> Optional[Union[str, bytes]]:
+        """Returns the stored output if the stage last ran with the same fingerprint."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, output_text, output_blob FROM stage_runs WHERE scope = ? AND stage = ?",
+                (str(scope), stage),
+            ).fetchone()
+        if row is None or row[0] != current:
+            record_cache(f"stage_{stage}", False)
+            return None
+        record_cache(f"stage_{stage}", True)
+        return row[2] if row[2] is not None else row[1]
+
+    def record(self, scope: Any, stage: str, current: str, output: Union[str, bytes]) -> None:
+        """Stores a successful run; call only after the stage has completed."""
+        is_blob = isinstance(output, (bytes, bytearray))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage_runs "
+                "(scope, stage, fingerprint, output_text, output_blob, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (str(scope), stage, current,
+                 None if is_blob else output, bytes(output) if is_blob else None,
+                 datetime.now().isoformat()),
+            )
+
+    def prune(self, stage: str, older_than_seconds: float) -> int:
+        """Deletes a stage's outputs recorded more than `older_than_seconds` ago."""
+        cutoff = datetime.fromtimestamp(time.time() - older_than_seconds).isoformat()
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM stage_runs WHERE stage = ? AND updated_at < ?", (stage, cutoff)
+            ).rowcount
+
+    def forget(self, scope: Any, stage: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            if stage is None:
+                self._conn.execute("DELETE FROM stage_runs WHERE scope = ?", (str(scope),))
+            else:
+                self._conn.execute("DELETE FROM stage_runs WHERE scope = ? AND stage = ?", (str(scope), stage))
+
+
+@lru_cache(maxsize=None)
+def get_fingerprint_store() -> FingerprintStore:
+    """Process-wide store, opened on first use."""
+    return FingerprintStore()
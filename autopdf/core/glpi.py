@@ -1,6 +1,8 @@
+import re
 import requests
 import json
 from core.config import settings
+from core.resilience import dependency, DependencyUnavailable
 from typing import Optional
 
 class GLPIClient:
@@ -9,11 +11,13 @@ class GLPIClient:
         self.app_token: str = settings.glpi_app_token  # Using settings
         self.user_token: str = settings.glpi_user_token  # Using settings
         self.session_token: Optional[str] = None
+        self.resilience = dependency("glpi")
         self.headers: dict = {
             "Content-Type": "application/json",
             "App-Token": self.app_token,
         }
-        self.init_session()
+        # The session is opened by the first request, so constructing the
+        # client never blocks on (or fails because of) GLPI
 
     def init_session(self) -> None:
         url = f"{self.base_url}/initSession"
@@ -21,8 +25,7 @@ class GLPIClient:
         headers["Authorization"] = f"user_token {self.user_token}"
 
         try:
-            response = requests.get(url, headers=headers, verify=False)
-            response.raise_for_status()
+            response = self.resilience.call(self._send, "GET", url, headers, operation="initSession")
             session_data = response.json()
             self.session_token = session_data.get("session_token")
             if not self.session_token:
@@ -43,38 +46,47 @@ class GLPIClient:
 
         url = f"{self.base_url}/killSession"
         try:
-            response = requests.get(url, headers=self.headers, verify=False)
-            response.raise_for_status()
+            self.resilience.call_once(self._send, "GET", url, self.headers, operation="killSession")
             print("GLPI session closed.")
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, DependencyUnavailable) as e:
             print(f"Error closing GLPI session: {e}")
         finally:
             self.session_token = None
             self.headers.pop("Session-Token", None)
 
-    def _make_request(self, method: str, endpoint: str, params: dict = None, data: dict = None) -> dict:
+    def _send(self, method: str, url: str, headers: dict, params: dict = None, data: dict = None,
+              stream: bool = False) -> requests.Response:
+        if method.upper() == "GET":
+            response = requests.get(url, headers=headers, params=params, verify=False,
+                                    stream=stream, timeout=settings.glpi_timeout)
+        elif method.upper() == "POST":
+            response = requests.post(url, headers=headers, json=data, verify=False, timeout=settings.glpi_timeout)
+        elif method.upper() == "PUT":
+            response = requests.put(url, headers=headers, json=data, verify=False, timeout=settings.glpi_timeout)
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        response.raise_for_status()
+        return response
+
+    def _make_request(self, method: str, endpoint: str, params: dict = None, data: dict = None,
+                      _reauthenticated: bool = False) -> dict:
         if not self.session_token:
             self.init_session()
 
         url = f"{self.base_url}/{endpoint}"
         try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=self.headers, params=params, verify=False)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=self.headers, json=data, verify=False)
-            elif method.upper() == "PUT":
-                response = requests.put(url, headers=self.headers, json=data, verify=False)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-
-            response.raise_for_status()
+            # Writes are not retried automatically: a timed-out POST may have succeeded
+            call = self.resilience.call if method.upper() == "GET" else self.resilience.call_once
+            # Latency baseline per endpoint shape, e.g. "GET Ticket/{id}/Document_Item"
+            operation = method.upper() + " " + re.sub(r"/\d+", "/{id}", endpoint)
+            response = call(self._send, method, url, self.headers, params, data, operation=operation)
             return response.json()
 
         except requests.exceptions.HTTPError as e:
-             if e.response.status_code == 401:
+             if e.response.status_code == 401 and not _reauthenticated:
                  print("Session expired or invalid. Re-initializing...")
                  self.init_session()
-                 return self._make_request(method, endpoint, params, data)
+                 return self._make_request(method, endpoint, params, data, _reauthenticated=True)
              else:
                 print(f"HTTP Error during GLPI request: {e}")
                 raise
@@ -90,6 +102,9 @@ class GLPIClient:
         if "filepath" not in doc_info or "filename" not in doc_info:
              raise ValueError("Invalid document response from GLPI: missing filepath or filename")
 
+        return self._download(document_id, doc_info)
+
+    def _download(self, document_id: int, doc_info: dict) -> bytes:
         download_url = f"{self.base_url}/{doc_info['filepath']}"
 
         try:
@@ -97,8 +112,8 @@ class GLPIClient:
                 "App-Token": self.app_token,
                 "Session-Token": self.session_token
             }
-            download_response = requests.get(download_url, headers=download_headers, verify=False, stream=True)
-            download_response.raise_for_status()
+            download_response = self.resilience.call(self._send, "GET", download_url, download_headers, stream=True,
+                                                        operation="download")
             return download_response.content
 
         except requests.exceptions.RequestException as e:
@@ -114,6 +129,32 @@ class GLPIClient:
     def get_ticket_tasks(self, ticket_id: int) -> list:
         return self._make_request("GET", f"Ticket/{ticket_id}/ITILTask")
 
+    def get_ticket_documents(self, ticket_id: int) -> list:
+        """Returns the documents linked to a ticket, with their GLPI sha1sum."""
+        documents = []
+        for item in self._make_request("GET", f"Ticket/{ticket_id}/Document_Item"):
+            document = self._make_request("GET", f"Document/{item['documents_id']}")
+            documents.append({
+                "id": document.get("id"),
+                "filename": document.get("filename"),
+                "sha1sum": document.get("sha1sum"),
+            })
+        return documents
+
+    def get_ticket_images(self, ticket_id: int, limit: int = 10) -> list:
+        """Downloads up to `limit` image attachments of a ticket, for previews in the report."""
+        images = []
+        for item in self._make_request("GET", f"Ticket/{ticket_id}/Document_Item"):
+            if len(images) >= limit:
+                break
+            document = self._make_request("GET", f"Document/{item['documents_id']}")
+            if not str(document.get("mime") or "").startswith("image/") or "filepath" not in document:
+                continue
+            data = self._download(document.get("id"), document)
+            if data:
+                images.append(data)
+        return images
+
     def update_ticket_solution(self, ticket_id: int, solution_content: str) -> bool:
         try:
             existing_solutions = self._make_request("GET", f"Ticket/{ticket_id}/ITILSolution")
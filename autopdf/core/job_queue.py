@@ -0,0 +1,296 @@
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from core.config import settings
+from typing import Callable, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    incident_id      INTEGER NOT NULL,
+    update_solution  INTEGER NOT NULL DEFAULT 0,
+    status           TEXT NOT NULL DEFAULT 'queued',
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    available_at     REAL NOT NULL,
+    lease_owner      TEXT,
+    lease_expires_at REAL,
+    last_error       TEXT,
+    created_at       TEXT NOT NULL,
+    updated_at       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_incident ON jobs (incident_id, status);
+"""
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+
+class JobQueue:
+    """Durable incident job queue in a local SQLite database (WAL mode).
+
+    Any number of processes on the host can share the same file. A job is
+    leased to one worker at a time; if the worker dies, the lease expires
+    after the visibility timeout and the job becomes available again.
+    Failed jobs are retried with exponential backoff and dead-lettered after
+    `max_attempts`.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, visibility_timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None) -> None:
+        self.db_path: str = db_path or settings.queue_db_path
+        self.visibility_timeout: float = visibility_timeout or settings.queue_visibility_timeout
+        self.max_attempts: int = max_attempts or settings.queue_max_attempts
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], object]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # take the write lock up front
+            try:
+                result = work(self._conn)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, incident_id: int, update_solution: bool = False) -> int:
+        """Adds a job, coalescing with a job for the same incident that hasn't started yet."""
+        now = time.time()
+        stamp = datetime.now().isoformat()
+
+        def work(conn: sqlite3.Connection) -> int:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE incident_id = ? AND status = ? AND attempts = 0 LIMIT 1",
+                (incident_id, QUEUED),
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET update_solution = MAX(update_solution, ?), updated_at = ? WHERE id = ?",
+                    (int(update_solution), stamp, row["id"]),
+                )
+                return row["id"]
+            cursor = conn.execute(
+                "INSERT INTO jobs (incident_id, update_solution, status, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (incident_id, int(update_solution), QUEUED, now, stamp, stamp),
+            )
+            return cursor.lastrowid
+
+        return self._transaction(work)
+
+    def lease(self, owner: str) -> Optional[Dict]:
+        """Claims the next ready job for `owner`, or returns None.
+
+        Expired leases are reclaimed, and an incident never has two jobs
+        leased at once, so the same ticket is not processed concurrently.
+        A job whose lease expired on its last allowed attempt (its worker
+        crashed, was OOM-killed or hung) is dead-lettered instead.
+        """
+        now = time.time()
+
+        def work(conn: sqlite3.Connection) -> Optional[Dict]:
+            expired = conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires_at = NULL, "
+                "last_error = 'Lease expired on attempt ' || attempts || ' (worker crashed or timed out)', "
+                "updated_at = ? WHERE status = ? AND lease_expires_at <= ? AND attempts >= ?",
+                (DEAD, datetime.now().isoformat(), LEASED, now, self.max_attempts),
+            )
+            if expired.rowcount:
+                print(f"Dead-lettered {expired.rowcount} job(s) whose last lease expired.")
+            row = conn.execute(
+                "SELECT * FROM jobs "
+                "WHERE ((status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at <= ?)) "
+                "AND incident_id NOT IN ("
+                "    SELECT incident_id FROM jobs WHERE status = ? AND lease_expires_at > ?) "
+                "ORDER BY available_at, id LIMIT 1",
+                (QUEUED, now, LEASED, now, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (LEASED, owner, now + self.visibility_timeout, datetime.now().isoformat(), row["id"]),
+            )
+            job = dict(row)
+            job["attempts"] += 1
+            job["update_solution"] = bool(job["update_solution"])
+            return job
+
+        return self._transaction(work)
+
+    def heartbeat(self, job_id: int, owner: str) -> bool:
+        """Extends a lease; returns False if the lease was lost to another worker."""
+        def work(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (time.time() + self.visibility_timeout, job_id, LEASED, owner),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(work)
+
+    def complete(self, job_id: int, owner: str) -> None:
+        def work(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires_at = NULL, last_error = NULL, "
+                "updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (DONE, datetime.now().isoformat(), job_id, owner),
+            )
+
+        self._transaction(work)
+
+    def fail(self, job_id: int, owner: str, error: str) -> str:
+        """Schedules a retry with backoff, or dead-letters the job. Returns the new status."""
+        def work(conn: sqlite3.Connection) -> str:
+            row = conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, owner)
+            ).fetchone()
+            if row is None:
+                return LEASED  # lease already lost; the new owner decides
+            if row["attempts"] >= self.max_attempts:
+                status, available_at = DEAD, time.time()
+            else:
+                status, available_at = QUEUED, time.time() + self.backoff(row["attempts"])
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (status, available_at, error[:2000], datetime.now().isoformat(), job_id),
+            )
+            return status
+
+        return self._transaction(work)
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Exponential backoff with full jitter."""
+        ceiling = min(settings.queue_retry_max_delay, settings.queue_retry_base_delay * 2 ** (attempts - 1))
+        return random.uniform(0, ceiling)
+
+    def requeue(self, job_id: int) -> None:
+        """Puts a dead-lettered job back on the queue with a fresh attempt budget."""
+        def work(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, time.time(), datetime.now().isoformat(), job_id, DEAD),
+            )
+
+        self._transaction(work)
+
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?", (DEAD, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, DEAD: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def purge_done(self, older_than_seconds: Optional[float] = None) -> int:
+        """Deletes finished jobs last updated more than `older_than_seconds` ago."""
+        if older_than_seconds is None:
+            older_than_seconds = settings.queue_done_retention
+        cutoff = datetime.fromtimestamp(time.time() - older_than_seconds).isoformat()
+
+        def work(conn: sqlite3.Connection) -> int:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status = ? AND updated_at < ?", (DONE, cutoff)
+            ).rowcount
+
+        return self._transaction(work)
+
+
+class JobWorker(threading.Thread):
+    """Pulls jobs from a JobQueue and runs them through `handler(job)`.
+
+    The lease is renewed in the background while the handler runs, so long
+    LLM runs are not picked up a second time by another worker. When idle,
+    the worker also purges old finished jobs every `queue_purge_interval`
+    seconds, so the table that `lease()` and `stats()` scan stays small.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Dict], object],
+                 poll_interval: Optional[float] = None, name: Optional[str] = None) -> None:
+        self.owner = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        super().__init__(name=self.owner, daemon=True)
+        self.queue = queue
+        self.handler = handler
+        self.poll_interval: float = poll_interval or settings.queue_poll_interval
+        self._stop_event = threading.Event()
+        self._last_purge: Optional[float] = None
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        print(f"Job worker {self.owner} started.")
+        while not self._stop_event.is_set():
+            try:
+                job = self.queue.lease(self.owner)
+            except sqlite3.OperationalError as e:  # e.g. database is locked
+                print(f"Job worker {self.owner} could not lease a job: {e}")
+                job = None
+            if job is None:
+                self._purge_if_due()
+                self._stop_event.wait(self.poll_interval)
+                continue
+            self._process(job)
+        print(f"Job worker {self.owner} stopped.")
+
+    def _purge_if_due(self) -> None:
+        if self._last_purge is not None and time.monotonic() - self._last_purge < settings.queue_purge_interval:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            purged = self.queue.purge_done()
+        except sqlite3.OperationalError as e:
+            print(f"Job worker {self.owner} could not purge finished jobs: {e}")
+            return
+        if purged:
+            print(f"Purged {purged} finished jobs.")
+
+    def _process(self, job: Dict) -> None:
+        done = threading.Event()
+
+        def keep_alive() -> None:
+            while not done.wait(self.queue.visibility_timeout / 3):
+                if not self.queue.heartbeat(job["id"], self.owner):
+                    print(f"Job {job['id']}: lease lost.")
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            self.handler(job)
+        except Exception as e:
+            status = self.queue.fail(job["id"], self.owner, f"{type(e).__name__}: {e}")
+            print(f"Job {job['id']} for incident {job['incident_id']} failed "
+                  f"(attempt {job['attempts']}, now {status}): {e}")
+        else:
+            self.queue.complete(job["id"], self.owner)
+        finally:
+            done.set()
+            heartbeat.join()
@@ -2,7 +2,196 @@ from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
 from core.config import settings
-from typing import Optional, Dict
+from core.resilience import dependency
+from core.metrics import llm_tokens
+from collections import deque
+import asyncio
+import math
+import threading
+import time
+from typing import Optional, Dict, List
+
+MAX_OUTPUT_TOKENS = 1000
+
+
+class LatencyHistogram:
+    """Rolling window of recent request latencies for one model."""
+
+    def __init__(self, window: int = 500) -> None:
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples: List[float] = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, min(len(samples) - 1, math.ceil(p / 100.0 * len(samples)) - 1))
+        return samples[rank]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+# Whether each recent request was hedged, to cap the hedge rate
+_recent_hedges: deque = deque(maxlen=200)
+_hedge_lock = threading.Lock()
+
+
+def latency_histogram(model_name: str) -> LatencyHistogram:
+    with _histograms_lock:
+        if model_name not in _histograms:
+            _histograms[model_name] = LatencyHistogram()
+        return _histograms[model_name]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for the LLM budget."""
+    return len(text) // 4 + 1
+
+
+def _build_chain(prompt: ChatPromptTemplate, model_name: str, api_base: str):
+    llm = ChatOpenAI(
+        model=model_name,  # Using settings
+        openai_api_base=api_base,  # Using settings
+        openai_api_key=settings.openai_api_key,  # Using settings
+        temperature=0.2,
+        max_tokens=MAX_OUTPUT_TOKENS,
+        request_timeout=settings.llm_request_timeout,
+        max_retries=0,  # retries are handled by the shared resilience layer
+        )
+    return prompt | llm | StrOutputParser()
+
+
+def _hedge_delay(model_name: str) -> Optional[float]:
+    """Seconds to wait before hedging, or None while there is too little history."""
+    histogram = latency_histogram(model_name)
+    if len(histogram) < settings.llm_hedge_min_samples:
+        return None
+    return histogram.percentile(settings.llm_hedge_percentile)
+
+
+def _claim_hedge(tokens: int) -> bool:
+    """Claims a hedge if under the rate cap and an LLM slot and `tokens` are free right now.
+
+    The hedge is an extra request, so it goes through the same concurrency
+    limit and token budget as the primary; when either is exhausted the
+    endpoint is already saturated and hedging would only add load.
+    """
+    with _hedge_lock:
+        hedged = sum(_recent_hedges)
+        if (hedged + 1) / (len(_recent_hedges) + 1) > settings.llm_hedge_max_rate:
+            return False
+        if not dependency("llm").try_acquire(tokens):
+            return False
+        _recent_hedges.append(True)
+        return True
+
+
+async def _timed_invoke(chain, input_data: Dict, model_name: str) -> str:
+    start = time.monotonic()
+    try:
+        result = await chain.ainvoke(input_data)
+    except asyncio.CancelledError:
+        # Cancelled losers are recorded too, so the tail isn't hidden by hedging
+        latency_histogram(model_name).record(time.monotonic() - start)
+        raise
+    latency_histogram(model_name).record(time.monotonic() - start)
+    return result
+
+
+def _operation(model_name: str, prompt_tokens: int) -> str:
+    """Groups LLM calls for the adaptive limit by model and prompt size (power-of-two buckets)."""
+    return f"{model_name}:{prompt_tokens.bit_length()}"
+
+
+async def _reserved_invoke(chain, input_data: Dict, model_name: str, reserved: int, prompt_tokens: int) -> str:
+    """Runs a hedge in the slot and token reservation taken by `_claim_hedge`, then returns both."""
+    llm_dependency = dependency("llm")
+    start = time.monotonic()
+    result = ""
+    try:
+        result = await _timed_invoke(chain, input_data, model_name)
+    except asyncio.CancelledError:
+        llm_dependency.release(None)
+        raise
+    except Exception as e:
+        llm_dependency.release(time.monotonic() - start, e, operation=_operation(model_name, prompt_tokens))
+        raise
+    else:
+        llm_dependency.release(time.monotonic() - start, operation=_operation(model_name, prompt_tokens))
+        return result
+    finally:
+        completion_tokens = estimate_tokens(result) if result else 0
+        llm_dependency.refund_tokens(reserved - prompt_tokens - completion_tokens)
+        llm_tokens.inc(prompt_tokens, model=model_name, kind="prompt")
+        llm_tokens.inc(completion_tokens, model=model_name, kind="completion")
+
+
+async def _hedged_invoke(prompt: ChatPromptTemplate, input_data: Dict, model_name: str) -> str:
+    """Sends the request; if it is slower than usual, races a second one against it."""
+    primary = asyncio.ensure_future(
+        _timed_invoke(_build_chain(prompt, model_name, settings.openai_api_base), input_data, model_name))
+    delay = _hedge_delay(model_name)
+    if delay is not None:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        prompt_tokens = estimate_tokens(prompt.format(**input_data))
+        reserved = prompt_tokens + MAX_OUTPUT_TOKENS
+        if not done and _claim_hedge(reserved):
+            hedge_model = settings.llm_hedge_model or model_name
+            hedge_base = settings.llm_hedge_api_base or settings.openai_api_base
+            print(f"LLM request to {model_name} exceeded p{settings.llm_hedge_percentile:g} "
+                  f"({delay:.1f}s); hedging with {hedge_model}.")
+            hedge = asyncio.ensure_future(_reserved_invoke(
+                _build_chain(prompt, hedge_model, hedge_base), input_data, hedge_model, reserved, prompt_tokens))
+            return await _first_success([primary, hedge])
+    with _hedge_lock:
+        _recent_hedges.append(False)
+    return await primary
+
+
+async def _first_success(tasks: List[asyncio.Future]) -> str:
+    """Returns the first successful result and cancels the rest."""
+    pending = set(tasks)
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _invoke(prompt: ChatPromptTemplate, input_data: Dict, model_name: str) -> str:
+    try:
+        asyncio.get_running_loop()
+        in_event_loop = True
+    except RuntimeError:
+        in_event_loop = False
+
+    if settings.llm_hedge_enabled and not in_event_loop:
+        return asyncio.run(_hedged_invoke(prompt, input_data, model_name))
+
+    chain = _build_chain(prompt, model_name, settings.openai_api_base)
+    start = time.monotonic()
+    result = chain.invoke(input_data)
+    latency_histogram(model_name).record(time.monotonic() - start)
+    return result
+
 
 def generate_text(prompt_template: str, input_data: Dict, model_name: Optional[str] = None) -> str:
     """Generates text using an OpenAI-compatible LLM."""
@@ -12,13 +201,18 @@ def generate_text(prompt_template: str, input_data: Dict, model_name: Optional[s
     # Use the provided model_name if given, otherwise use the default from settings
     effective_model_name = model_name if model_name else settings.model_name
 
-    llm = ChatOpenAI(
-        model=effective_model_name,  # Using settings
-        openai_api_base=settings.openai_api_base,  # Using settings
-        openai_api_key=settings.openai_api_key,  # Using settings
-        temperature=0.2,
-        max_tokens=1000,
-        )
-    chain = prompt | llm | StrOutputParser()
-    generated_text = chain.invoke(input_data)
+    # Reserve the worst case up front, then hand back what wasn't used
+    llm_dependency = dependency("llm")
+    prompt_tokens = estimate_tokens(prompt.format(**input_data))
+    reserved = prompt_tokens + MAX_OUTPUT_TOKENS
+    llm_dependency.acquire_tokens(reserved)
+    generated_text = ""
+    try:
+        generated_text = llm_dependency.call(_invoke, prompt, input_data, effective_model_name,
+                                             operation=_operation(effective_model_name, prompt_tokens))
+    finally:
+        completion_tokens = estimate_tokens(generated_text) if generated_text else 0
+        llm_dependency.refund_tokens(reserved - prompt_tokens - completion_tokens)
+        llm_tokens.inc(prompt_tokens, model=effective_model_name, kind="prompt")
+        llm_tokens.inc(completion_tokens, model=effective_model_name, kind="completion")
     return generated_text
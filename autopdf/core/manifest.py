@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from core.config import settings
+from typing import Optional, List, Dict, Iterable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    object_name   TEXT PRIMARY KEY,
+    incident_id   TEXT NOT NULL,
+    incident_type TEXT NOT NULL,
+    version       TEXT NOT NULL,
+    size          INTEGER,
+    etag          TEXT,
+    recorded_at   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_versions_incident ON versions (incident_id, version);
+"""
+
+_INSERT = (
+    "INSERT OR REPLACE INTO versions "
+    "(object_name, incident_id, incident_type, version, size, etag, recorded_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def parse_object_name(object_name: str) -> Optional[Dict[str, str]]:
+    """Splits '{incident_type}/{incident_id}/{version}.pdf' into its parts."""
+    parts = object_name.split("/")
+    if len(parts) != 3 or not parts[2].endswith(".pdf"):
+        return None
+    incident_type, incident_id, filename = parts
+    return {
+        "incident_type": incident_type,
+        "incident_id": incident_id,
+        "version": filename[:-len(".pdf")],
+    }
+
+
+class ManifestIndex:
+    """Local SQLite manifest of the PDF versions stored in Wasabi.
+
+    Versions are named '{timestamp}_{hash}' so they sort chronologically,
+    which lets "latest version" be answered from the index alone.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.db_path: str = db_path or settings.manifest_db_path
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def record(self, object_name: str, size: Optional[int] = None, etag: Optional[str] = None) -> bool:
+        """Adds or refreshes a version. Returns False for keys outside the layout."""
+        parts = parse_object_name(object_name)
+        if parts is None:
+            return False
+        with self._lock, self._conn:
+            self._conn.execute(
+                _INSERT,
+                (object_name, parts["incident_id"], parts["incident_type"], parts["version"],
+                 size, etag, datetime.now().isoformat()),
+            )
+        return True
+
+    def remove(self, object_name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM versions WHERE object_name = ?", (object_name,))
+
+    def versions(self, incident_id) -> List[Dict]:
+        """All known versions of an incident, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM versions WHERE incident_id = ? ORDER BY version DESC",
+                (str(incident_id),),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest(self, incident_id) -> Optional[Dict]:
+        """The newest PDF version of an incident, or None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM versions WHERE incident_id = ? ORDER BY version DESC LIMIT 1",
+                (str(incident_id),),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get(self, incident_id, version: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM versions WHERE incident_id = ? AND version = ?",
+                (str(incident_id), version),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def rebuild(self, objects: Iterable[Dict], batch_size: int = 500) -> int:
+        """Replaces the manifest with the given listing entries.
+
+        `objects` is typically `WasabiClient.iter_objects(bucket, recursive=True)`.
+        It is consumed lazily into a temporary table, which doesn't lock the
+        manifest, and swapped in with one short transaction at the end, so
+        `record()` in other processes keeps working during a long listing.
+        Versions recorded after the rebuild started are kept even if the
+        listing missed them.
+        """
+        count = 0
+        started = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute("DROP TABLE IF EXISTS temp.rebuild_versions")
+            self._conn.execute("CREATE TEMP TABLE rebuild_versions AS SELECT * FROM versions WHERE 0")
+        insert = _INSERT.replace("INTO versions", "INTO temp.rebuild_versions")
+        batch = []
+        for obj in objects:
+            parts = parse_object_name(obj["Key"])
+            if parts is None:
+                continue
+            batch.append((obj["Key"], parts["incident_id"], parts["incident_type"], parts["version"],
+                          obj.get("Size"), (obj.get("ETag") or "").strip('"') or None, started))
+            count += 1
+            if len(batch) >= batch_size:
+                with self._lock, self._conn:
+                    self._conn.executemany(insert, batch)
+                batch = []
+        with self._lock, self._conn:
+            self._conn.executemany(insert, batch)
+            self._conn.execute("DELETE FROM versions WHERE recorded_at < ?", (started,))
+            self._conn.execute("INSERT OR IGNORE INTO versions SELECT * FROM temp.rebuild_versions")
+            self._conn.execute("DROP TABLE temp.rebuild_versions")
+        print(f"Manifest rebuilt with {count} versions.")
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_manifest_index() -> ManifestIndex:
+    """Process-wide manifest, opened on first use."""
+    return ManifestIndex()
+
+
+if __name__ == "__main__":
+    from core.wasabi_client import WasabiClient
+
+    ManifestIndex().rebuild(WasabiClient().iter_objects(settings.bucket_name, recursive=True))
@@ -1,27 +1,96 @@
 import meilisearch
 from core.config import settings
-from typing import List, Optional, Dict
+from core.resilience import dependency
+from functools import lru_cache
+from meilisearch.models.task import TaskInfo
+from typing import List, Optional, Dict, Iterator
+
+# Attributes of the incident index that searches can filter and facet on
+INCIDENT_FILTERABLE_ATTRIBUTES = ["incident_id", "incident_type", "status", "date_day"]
+
+
+def date_day(date: Optional[str]) -> Optional[int]:
+    """'YYYY-MM-DD[ HH:MM:SS]' as the number YYYYMMDD, which Meilisearch can range-filter."""
+    try:
+        return int((date or "")[:10].replace("-", ""))
+    except ValueError:
+        return None
 
 class MeilisearchClient:
     def __init__(self) -> None:
         self.client = meilisearch.Client(settings.meilisearch_url, settings.meilisearch_master_key) # Using settings
+        self.resilience = dependency("meilisearch")
+        self._filterable: Dict[str, List[str]] = {}
 
-    def index_document(self, index_name: str, document: dict) -> None:
+    def index_document(self, index_name: str, document: dict) -> TaskInfo:
+        """Queues the document for indexing; pass the result to `wait_for_task`."""
         index = self.client.index(index_name)
-        index.add_documents([document])
+        return self.resilience.call(index.add_documents, [document])
+
+    def wait_for_task(self, task: TaskInfo, timeout: float = 10.0) -> bool:
+        """Blocks until Meilisearch has processed `task`; False if it failed or timed out."""
+        try:
+            result = self.client.wait_for_task(task.task_uid, timeout_in_ms=int(timeout * 1000))
+        except meilisearch.errors.MeilisearchTimeoutError:
+            print(f"Meilisearch task {task.task_uid} still pending after {timeout}s")
+            return False
+        if result.status != "succeeded":
+            print(f"Meilisearch task {task.task_uid} {result.status}: {result.error}")
+            return False
+        return True
 
     def search(self, index_name: str, query: str, limit:int = 5) -> List[dict]:
         index = self.client.index(index_name)
-        result = index.search(query, {"limit": limit})
+        result = self.resilience.call(index.search, query, {"limit": limit})
         return result['hits']
 
+    def search_page(self, index_name: str, query: str, filter: Optional[str] = None,
+                    facets: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                    offset: int = 0, limit: int = 20) -> Dict:
+        """Runs a search and returns the whole response: hits, estimated total and facet counts."""
+        index = self.client.index(index_name)
+        params = {"offset": offset, "limit": limit}
+        if filter:
+            params["filter"] = filter
+        if facets:
+            params["facets"] = facets
+        if fields:
+            params["attributesToRetrieve"] = fields
+        return dict(self.resilience.call(index.search, query, params))
+
+    def ensure_filterable(self, index_name: str, attributes: List[str]) -> None:
+        """Makes `attributes` filterable and facetable; sent once per index and process."""
+        if self._filterable.get(index_name) == attributes:
+            return
+        index = self.client.index(index_name)
+        self.resilience.call(index.update_filterable_attributes, attributes)
+        self._filterable[index_name] = list(attributes)
+
+    def iter_documents(self, index_name: str, fields: Optional[List[str]] = None, batch_size: int = 500,
+                       filter: Optional[str] = None) -> Iterator[Dict]:
+        """Streams the documents of an index (matching `filter`, if given), one page at a time."""
+        index = self.client.index(index_name)
+        offset = 0
+        while True:
+            params = {"offset": offset, "limit": batch_size}
+            if fields:
+                params["fields"] = fields
+            if filter:
+                params["filter"] = filter
+            page = self.resilience.call(index.get_documents, params)
+            for document in page.results:
+                yield dict(document)
+            if len(page.results) < batch_size:
+                return
+            offset += batch_size
+
     def create_index(self, index_name: str) -> None:
         try:
-            self.client.create_index(index_name)
+            self.resilience.call(self.client.create_index, index_name)
         except meilisearch.errors.MeilisearchCommunicationError as e:
             print("Meilisearch Communication Error:", e)
             raise
-        except meilisearch.errors.MeilisearchAPIError as e:
+        except meilisearch.errors.MeilisearchApiError as e:
             print("Meilisearch API Error:", e)
             if e.code == 'index_already_exists':
                 print(f"Index '{index_name}' already exists.")
@@ -30,11 +99,11 @@ class MeilisearchClient:
 
     def delete_index(self, index_name:str) -> None:
         try:
-            self.client.delete_index(index_name)
+            self.resilience.call(self.client.delete_index, index_name)
         except meilisearch.errors.MeilisearchCommunicationError as e:
             print("Meilisearch Communication Error:", e)
             raise
-        except meilisearch.errors.MeilisearchAPIError as e:
+        except meilisearch.errors.MeilisearchApiError as e:
             print("Meilisearch API Error:", e)
             if e.code == 'index_not_found':
                 print(f"Index '{index_name}' not found.")
@@ -44,18 +113,24 @@ class MeilisearchClient:
     def get_document(self, index_name: str, doc_id: str) -> Optional[Dict]:
         index = self.client.index(index_name)
         try:
-            return index.get_document(doc_id)
+            return self.resilience.call(index.get_document, doc_id)
         except meilisearch.errors.MeilisearchCommunicationError as e:
             print("Meilisearch Communication Error:", e)
             return None
-        except meilisearch.errors.MeilisearchAPIError as e:
+        except meilisearch.errors.MeilisearchApiError as e:
              if e.code == 'document_not_found':
                 return None
              else:
                  print("Meilisearch API Error:", e)
                  return None
 
-    def update_document(self, index_name: str, document: dict) -> Dict:
+    def update_document(self, index_name: str, document: dict) -> TaskInfo:
         index = self.client.index(index_name)
-        response = index.update_documents([document])
+        response = self.resilience.call(index.update_documents, [document])
         return response
+
+
+@lru_cache(maxsize=None)
+def get_meilisearch_client() -> MeilisearchClient:
+    """Process-wide client, created on first use."""
+    return MeilisearchClient()
@@ -0,0 +1,448 @@
+import atexit
+import contextvars
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import ContextDecorator, contextmanager
+from datetime import datetime
+from core.config import settings
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latencies here range from milliseconds (Meilisearch) to minutes (multi-pass LLM runs)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+# One snapshot file per process in `settings.metrics_dir`; see `render()`
+_process_id = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+_ARCHIVE = "archive.json"
+_flusher: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type_name = ""
+    shared = False
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Tuple[str, ...] = tuple(label_names)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def collect(self) -> Dict[Tuple[str, ...], Any]:
+        raise NotImplementedError
+
+    def family(self) -> Dict[str, Any]:
+        """This metric's definition and current values, in a JSON-friendly form."""
+        return {
+            "name": self.name,
+            "help": self.documentation,
+            "type": self.type_name,
+            "labels": list(self.label_names),
+            "buckets": list(getattr(self, "buckets", ())),
+            "values": [[list(key), value] for key, value in self.collect().items()],
+        }
+
+    def render(self) -> str:
+        return _render_family(self.family())
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.label_names:
+            values[()] = 0.0
+        return values
+
+
+class Gauge(_Metric):
+    """A gauge set directly, or computed at scrape time from `callback`.
+
+    `shared=True` marks a value read from state every process sees, such as
+    the job store; it is reported once, by the process serving the scrape,
+    without the per-process `pid` label.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+                 shared: bool = False) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+        self.shared = shared
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            values = dict(self._values)
+        if self.callback:
+            try:
+                values.update(self.callback())
+            except Exception as e:
+                print(f"Error collecting gauge {self.name}: {e}")
+        return values
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def collect(self) -> Dict[Tuple[str, ...], List[float]]:
+        """Per label set: the non-cumulative bucket counts followed by the sum."""
+        with self._lock:
+            return {key: list(counts) + [self._sums[key]] for key, counts in self._counts.items()}
+
+
+def _render_family(family: Dict[str, Any]) -> str:
+    name, label_names = family["name"], family["labels"]
+    lines = [f"# HELP {name} {family['help']}", f"# TYPE {name} {family['type']}"]
+    values = sorted((tuple(key), value) for key, value in family["values"])
+    if family["type"] != "histogram":
+        lines.extend(f"{name}{_format_labels(label_names, key)} {value}" for key, value in values)
+        return "\n".join(lines)
+
+    bounds = tuple(family["buckets"]) + (float("inf"),)
+    for key, value in values:
+        cumulative = 0
+        for bound, count in zip(bounds, value[:-1]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            le_label = f'le="{le}"'
+            lines.append(f"{name}_bucket{_format_labels(label_names, key, le_label)} {cumulative}")
+        lines.append(f"{name}_count{_format_labels(label_names, key)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(label_names, key)} {value[-1]}")
+    return "\n".join(lines)
+
+
+def _snapshot(shared: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """Families of this process; `shared` selects only shared or only per-process gauges."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return [metric.family() for metric in metrics if shared is None or metric.shared == shared]
+
+
+def _merge(merged: Dict[str, Dict[str, Any]], families: List[Dict[str, Any]], pid: Optional[str] = None) -> None:
+    """Adds counters and histograms into `merged`; gauges are kept apart with a `pid` label.
+
+    Gauges are skipped when `pid` is None: a stopped process has no current value.
+    """
+    for family in families:
+        if family["type"] == "gauge":
+            if pid is None:
+                continue
+            family = dict(family, labels=family["labels"] + ["pid"],
+                          values=[[key + [pid], value] for key, value in family["values"]])
+        target = merged.setdefault(family["name"], dict(family, values={}))
+        for key, value in family["values"]:
+            key = tuple(key)
+            if family["type"] == "gauge":
+                target["values"][key] = value
+            elif family["type"] == "histogram":
+                current = target["values"].get(key, [0] * len(value))
+                target["values"][key] = [a + b for a, b in zip(current, value)]
+            else:
+                target["values"][key] = target["values"].get(key, 0.0) + value
+
+
+def _unmerge(merged: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turns the output of `_merge` back into a list of families."""
+    return [dict(family, values=[[list(key), value] for key, value in family["values"].items()])
+            for family in merged.values()]
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def flush() -> None:
+    """Writes this process's metrics to its snapshot file in `settings.metrics_dir`."""
+    if not settings.metrics_dir:
+        return
+    try:
+        os.makedirs(settings.metrics_dir, exist_ok=True)
+        # Shared gauges are collected by whichever process serves the scrape
+        _write_json(os.path.join(settings.metrics_dir, f"{_process_id}.json"), _snapshot(shared=False))
+    except OSError as e:
+        print(f"Error writing metrics snapshot: {e}")
+
+
+def start_flusher() -> None:
+    """Flushes this process's metrics every `metrics_flush_interval` seconds, and at exit.
+
+    Call it in every long-running process (API workers and `worker.py`), so
+    `/metrics` on any of them covers the whole host.
+    """
+    global _flusher
+    if not settings.metrics_dir:
+        return
+    with _flusher_lock:
+        if _flusher is not None:
+            return
+
+        def run() -> None:
+            while True:
+                flush()
+                time.sleep(settings.metrics_flush_interval)
+
+        _flusher = threading.Thread(target=run, name="metrics-flusher", daemon=True)
+        _flusher.start()
+        atexit.register(flush)
+
+
+def _collect_processes() -> Dict[str, Dict[str, Any]]:
+    """Merges the snapshots of every process sharing `settings.metrics_dir`.
+
+    Snapshots not refreshed for three flush intervals belong to stopped
+    processes: their counters and histograms are folded into an archive file,
+    so totals never go backwards, and their gauges are dropped.
+    """
+    directory = settings.metrics_dir
+    stale_before = time.time() - 3 * settings.metrics_flush_interval
+    merged: Dict[str, Dict[str, Any]] = {}
+    with open(os.path.join(directory, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            archive_path = os.path.join(directory, _ARCHIVE)
+            archive: Dict[str, Dict[str, Any]] = {}
+            _merge(archive, _read_json(archive_path) or [])
+            stale = []
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(".json") or filename == _ARCHIVE:
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    is_stale = filename != f"{_process_id}.json" and os.path.getmtime(path) < stale_before
+                except OSError:
+                    continue
+                families = _read_json(path)
+                if families is None:
+                    continue
+                if is_stale:
+                    _merge(archive, families)
+                    stale.append(path)
+                else:
+                    _merge(merged, families, pid=filename.split("_")[0])
+            if stale:
+                _write_json(archive_path, _unmerge(archive))
+                for path in stale:
+                    os.remove(path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    _merge(merged, _unmerge(archive))
+    return merged
+
+
+def render() -> str:
+    """Metrics in the Prometheus text exposition format.
+
+    With `settings.metrics_dir` set, this covers every process on the host:
+    counters and histograms are summed and gauges get a `pid` label, so
+    scrapes that land on different uvicorn workers agree. Shared gauges come
+    from this process alone. Otherwise only this process is reported.
+    """
+    if not settings.metrics_dir:
+        return "\n".join(_render_family(family) for family in _snapshot()) + "\n"
+    flush()
+    try:
+        merged = _collect_processes()
+    except OSError as e:
+        print(f"Error reading metrics snapshots, serving this process only: {e}")
+        return "\n".join(_render_family(family) for family in _snapshot()) + "\n"
+    return "\n".join(_render_family(family) for family in _unmerge(merged) + _snapshot(shared=True)) + "\n"
+
+
+stage_duration = Histogram("autopdf_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"])
+stage_errors = Counter("autopdf_stage_errors_total", "Pipeline stages that raised.", ["stage"])
+dependency_duration = Histogram("autopdf_dependency_request_duration_seconds",
+                                "Latency of calls to external services.", ["dependency"])
+dependency_requests = Counter("autopdf_dependency_requests_total",
+                              "Calls to external services by outcome.", ["dependency", "outcome"])
+cache_requests = Counter("autopdf_cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"])
+llm_tokens = Counter("autopdf_llm_tokens_total", "Estimated LLM tokens by model and kind.", ["model", "kind"])
+bytes_uploaded = Counter("autopdf_bytes_uploaded_total", "Bytes uploaded to Wasabi.")
+pdf_size = Histogram("autopdf_pdf_size_bytes", "Size of rendered PDFs.",
+                     buckets=(10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 20_000_000))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class Trace:
+    """Spans recorded during one pipeline run, dumped as JSON when the run is slow."""
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes or {}
+        self.started = time.monotonic()
+        self.started_at = datetime.now().isoformat()
+        self.spans: List[Dict] = []
+        self._stack: List[int] = []
+        self._lock = threading.Lock()
+
+    def open_span(self, name: str) -> int:
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "parent": self._stack[-1] if self._stack else None,
+                "start": round(time.monotonic() - self.started, 6),
+                "duration": None,
+                "error": None,
+            })
+            index = len(self.spans) - 1
+            self._stack.append(index)
+            return index
+
+    def close_span(self, index: int, duration: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.spans[index]["duration"] = round(duration, 6)
+            self.spans[index]["error"] = error
+            if index in self._stack:
+                self._stack.remove(index)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "started_at": self.started_at,
+            "duration": round(time.monotonic() - self.started, 6),
+            "spans": self.spans,
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("autopdf_trace", default=None)
+
+
+@contextmanager
+def trace_run(name: str, **attributes) -> Iterator[Trace]:
+    """Collects spans for one run; writes them to `settings.trace_dir` if it was slow."""
+    trace = Trace(name, attributes)
+    token = _current_trace.set(trace)
+    try:
+        with timed(name):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+        duration = time.monotonic() - trace.started
+        if settings.trace_slow_run_seconds >= 0 and duration >= settings.trace_slow_run_seconds:
+            _dump_trace(trace)
+
+
+def _dump_trace(trace: Trace) -> None:
+    try:
+        os.makedirs(settings.trace_dir, exist_ok=True)
+        path = os.path.join(settings.trace_dir, f"{datetime.now():%Y%m%d_%H%M%S}_{trace.name}_{trace.trace_id[:8]}.json")
+        with open(path, "w") as file:
+            json.dump(trace.to_dict(), file, indent=2, default=str)
+        print(f"Slow run trace written to {path}")
+    except OSError as e:
+        print(f"Error writing trace: {e}")
+
+
+class timed(ContextDecorator):
+    """Times a block or function into a histogram and the current trace, if any.
+
+        with timed("render"): ...
+
+        @timed("process")
+        def process(...): ...
+    """
+
+    def __init__(self, name: str, histogram: Histogram = stage_duration, errors: Optional[Counter] = stage_errors,
+                 **labels: str) -> None:
+        self.name = name
+        self.histogram = histogram
+        self.errors = errors
+        self.labels = labels or {"stage": name}
+        self._local = threading.local()
+
+    def __enter__(self) -> "timed":
+        trace = _current_trace.get()
+        starts = getattr(self._local, "starts", None)
+        if starts is None:
+            starts = self._local.starts = []
+        starts.append((time.monotonic(), trace, trace.open_span(self.name) if trace else None))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        start, trace, span = self._local.starts.pop()
+        duration = time.monotonic() - start
+        self.histogram.observe(duration, **self.labels)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc(**self.labels)
+        if trace is not None:
+            trace.close_span(span, duration, f"{exc_type.__name__}: {exc}" if exc_type else None)
+        return False
@@ -0,0 +1,212 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from core.config import settings
+from core.pdf_utils import create_pdf_from_text, write_digest_pdf, register_fonts, get_styles
+from core.metrics import timed, pdf_size
+from typing import Optional, Iterable, Iterator, Tuple, Dict, List
+
+_executor: Optional[ProcessPoolExecutor] = None
+_digest_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_DIGEST_FIELDS = ["id", "incident_id", "incident_type", "version", "name", "date", "content"]
+
+
+def _warm_worker() -> None:
+    """Runs once in every pool process so the first render doesn't pay for imports and fonts."""
+    register_fonts()
+    get_styles()
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """Returns the shared render pool, or None when rendering runs inline."""
+    global _executor
+    if settings.pdf_render_workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.pdf_render_workers,
+                mp_context=multiprocessing.get_context("spawn"),  # don't fork a threaded server
+                initializer=_warm_worker,
+            )
+        return _executor
+
+
+def get_digest_executor() -> Optional[ProcessPoolExecutor]:
+    """A one-process pool of its own for digests, so a long digest doesn't hold up ticket renders."""
+    global _digest_executor
+    if settings.pdf_render_workers <= 0:
+        return None
+    with _executor_lock:
+        if _digest_executor is None:
+            _digest_executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return _digest_executor
+
+
+def warm_pool() -> None:
+    """Starts every render process and has each render a throwaway report.
+
+    The pool spawns processes on demand; submitting one job per worker at
+    once, before any can finish, makes it start all of them now.
+    """
+    executor = get_executor()
+    if executor is None:
+        return
+    warm_ups = [executor.submit(_render_report, ("Warm-up", "Warm-up"))
+                for _ in range(settings.pdf_render_workers)]
+    for warm_up in warm_ups:
+        warm_up.result()
+
+
+def shutdown() -> None:
+    global _executor, _digest_executor
+    with _executor_lock:
+        for executor in (_executor, _digest_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        _executor = _digest_executor = None
+
+
+def _render_report(report: Tuple[str, str]) -> bytes:
+    content, title = report
+    return create_pdf_from_text(content, title)
+
+
+def render_pdf(content: str, title: str = "Incident Report", images: Optional[List[bytes]] = None) -> bytes:
+    """Renders one report in the pool, keeping the CPU work off the caller's GIL."""
+    executor = get_executor()
+    # Timed here, in the calling process, so the metrics land where /metrics is served
+    with timed("render"):
+        if executor is None:
+            pdf = create_pdf_from_text(content, title, images)
+        else:
+            pdf = executor.submit(create_pdf_from_text, content, title, images).result()
+    pdf_size.observe(len(pdf))
+    return pdf
+
+
+def render_batch(reports: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """Renders (content, title) pairs in parallel, yielding PDFs in input order.
+
+    Only a small window of reports is in flight at once, so arbitrarily long
+    (lazy) inputs don't pile up as pending futures and results.
+    """
+    executor = get_executor()
+    if executor is None:
+        for report in reports:
+            yield _render_report(report)
+        return
+
+    window = max(1, settings.pdf_render_workers * 2)
+    pending = deque()
+    for report in reports:
+        pending.append(executor.submit(_render_report, report))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _date_filter(start_date: Optional[str], end_date: Optional[str]) -> Optional[str]:
+    """Meilisearch filter on the numeric `date_day` field for an inclusive 'YYYY-MM-DD' range."""
+    from core.meilisearch_client import date_day
+
+    clauses = []
+    if start_date:
+        clauses.append(f"date_day >= {date_day(start_date)}")
+    if end_date:
+        clauses.append(f"date_day <= {date_day(end_date)}")
+    if not clauses:
+        return "date_day EXISTS"
+    return " AND ".join(clauses)
+
+
+def _iter_digest_reports(index_name: str, start_date: Optional[str], end_date: Optional[str]) -> Iterator[Dict]:
+    from core.meilisearch_client import MeilisearchClient
+
+    client = MeilisearchClient()
+    date_filter = _date_filter(start_date, end_date)
+    # First pass keeps only ids, to pick the latest version of each incident in the range
+    latest: Dict[str, Tuple[str, str]] = {}
+    for doc in client.iter_documents(index_name, fields=["id", "incident_id", "version"], filter=date_filter):
+        key = str(doc.get("incident_id"))
+        if key not in latest or doc.get("version", "") > latest[key][0]:
+            latest[key] = (doc.get("version", ""), doc["id"])
+    wanted = {doc_id for _, doc_id in latest.values()}
+
+    for doc in client.iter_documents(index_name, fields=_DIGEST_FIELDS, filter=date_filter):
+        if doc.get("id") in wanted:
+            yield doc
+
+
+def _build_digest(output_path: str, start_date: Optional[str], end_date: Optional[str],
+                  title: str, index_name: str) -> int:
+    reports = _iter_digest_reports(index_name, start_date, end_date)
+    return write_digest_pdf(reports, output_path, title)
+
+
+def render_digest(output_path: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  title: Optional[str] = None, index_name: str = "glpi_incidents") -> int:
+    """Writes one digest PDF of all incidents dated within [start_date, end_date].
+
+    Dates are 'YYYY-MM-DD' strings. Incidents are streamed from the search
+    index straight into the PDF file, so large ranges never sit in memory.
+    The digest is built in a process of its own, away from the ticket render
+    pool. Returns the number of pages written.
+    """
+    if title is None:
+        title = f"Incident Digest {start_date or ''} - {end_date or ''}".strip(" -")
+    executor = get_digest_executor()
+    if executor is None:
+        return _build_digest(output_path, start_date, end_date, title, index_name)
+    return executor.submit(_build_digest, output_path, start_date, end_date, title, index_name).result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render PDFs outside the pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    digest = commands.add_parser("digest", help="one PDF of all incidents dated within a range")
+    digest.add_argument("--from", dest="start_date", help="first day, YYYY-MM-DD")
+    digest.add_argument("--to", dest="end_date", help="last day, YYYY-MM-DD")
+    digest.add_argument("--title")
+    digest.add_argument("--out", required=True, help="PDF file to write")
+    batch = commands.add_parser("batch", help="one PDF per text/markdown file")
+    batch.add_argument("files", nargs="+")
+    batch.add_argument("--out", required=True, help="directory for the PDFs")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "digest":
+            pages = render_digest(args.out, args.start_date, args.end_date, args.title)
+            print(f"Digest written to {args.out} ({pages} pages).")
+            return 0
+
+        os.makedirs(args.out, exist_ok=True)
+
+        def reports() -> Iterator[Tuple[str, str]]:
+            for path in args.files:
+                with open(path, encoding="utf-8") as file:
+                    yield file.read(), os.path.splitext(os.path.basename(path))[0]
+
+        for path, pdf in zip(args.files, render_batch(reports())):
+            output_path = os.path.join(args.out, os.path.splitext(os.path.basename(path))[0] + ".pdf")
+            with open(output_path, "wb") as file:
+                file.write(pdf)
+            print(f"Wrote {output_path}")
+        return 0
+    finally:
+        shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,232 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Preformatted, ListFlowable, ListItem, CondPageBreak
+from reportlab.lib.styles import getSampleStyleSheet, StyleSheet1
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from PIL import Image as PILImage
 from reportlab.lib.units import inch
+from reportlab.lib.pagesizes import A4
+from xml.sax.saxutils import escape
+from functools import lru_cache
 import io
+import re
 from core.config import settings
-from typing import Optional
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
 
-def create_pdf_from_text(content: str, title: str = "Incident Report") -> bytes:
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer)
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET_RE = re.compile(r"^\s*[-*+•]\s+(.*)$")
+_NUMBERED_RE = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC_RE = re.compile(r"(?<![\w*])[*_](?!\s)(.+?)(?<!\s)[*_](?![\w*])")
+_CODE_RE = re.compile(r"`([^`]+)`")
+
+# Markdown heading depth -> stylesheet name ('h1' is reserved for the title)
+_HEADING_STYLES = {1: "h2", 2: "h3", 3: "h4"}
+
+
+@lru_cache(maxsize=None)
+def register_fonts() -> Optional[str]:
+    """Registers the configured TTF body font once per process; returns its name."""
+    if not settings.pdf_font_path:
+        return None
+    pdfmetrics.registerFont(TTFont(settings.pdf_font_name, settings.pdf_font_path))
+    return settings.pdf_font_name
+
+
+@lru_cache(maxsize=None)
+def get_styles() -> StyleSheet1:
+    """Returns the process-wide stylesheet; building it is not free, so do it once."""
     styles = getSampleStyleSheet()
+    font_name = register_fonts()
+    if font_name:
+        for style_name in ("Normal", "BodyText", "Bullet"):
+            styles[style_name].fontName = font_name
+    return styles
+
+
+@lru_cache(maxsize=None)
+def get_doc_template_options() -> Dict[str, Any]:
+    """Page layout and output profile shared by every report built in this process.
+
+    "compact" forces deflated page streams whatever `rl_config` says; "default"
+    leaves compression to ReportLab's own default (also on in stock ReportLab).
+    Embedded TTF fonts (see `register_fonts`) are always subset by ReportLab.
+    `invariant` drops the creation timestamp and random document ID, so the
+    same content renders to the same bytes and the store stage can skip it.
+    """
+    return {
+        "pagesize": A4,
+        "leftMargin": inch,
+        "rightMargin": inch,
+        "topMargin": inch,
+        "bottomMargin": inch,
+        "pageCompression": 1 if settings.pdf_profile == "compact" else None,
+        "invariant": 1,
+    }
+
+
+def _frame_size() -> Tuple[float, float]:
+    options = get_doc_template_options()
+    width, height = options["pagesize"]
+    return (width - options["leftMargin"] - options["rightMargin"],
+            height - options["topMargin"] - options["bottomMargin"])
+
+
+def image_preview(data: bytes, max_width: Optional[float] = None, max_height: Optional[float] = None) -> Image:
+    """Builds an Image flowable for an attachment, downscaled to what the page can show.
+
+    The bitmap is resampled to `settings.pdf_image_dpi` at its printed size and
+    re-encoded as JPEG, so a 12 MP photo doesn't get embedded at full size.
+    """
+    frame_width, frame_height = _frame_size()
+    max_width = max_width or frame_width
+    max_height = max_height or frame_height / 2
+
+    with PILImage.open(io.BytesIO(data)) as source:
+        source.load()
+        scale = min(max_width / source.width, max_height / source.height, 1.0)
+        width, height = source.width * scale, source.height * scale  # in points
+
+        pixels = (max(1, round(width / 72 * settings.pdf_image_dpi)),
+                  max(1, round(height / 72 * settings.pdf_image_dpi)))
+        image = source.convert("RGBA") if source.mode in ("P", "LA") else source
+        if image.mode == "RGBA":
+            background = PILImage.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        if pixels[0] < image.width:
+            image = image.resize(pixels, PILImage.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=settings.pdf_image_quality, optimize=True)
+    output.seek(0)
+    return Image(output, width=width, height=height)
+
+
+def _inline_markup(text: str) -> str:
+    """Escapes ReportLab's mini-HTML and maps basic markdown emphasis onto it."""
+    text = escape(text)
+    text = _CODE_RE.sub(r'<font face="Courier">\1</font>', text)
+    text = _BOLD_RE.sub(r"<b>\1</b>", text)
+    text = _ITALIC_RE.sub(r"<i>\1</i>", text)
+    return text
+
+
+def _markup_paragraph(text: str, style) -> Paragraph:
+    """Paragraph with markdown emphasis, or plain escaped text if the emphasis doesn't nest.
+
+    Overlapping markers such as `**a *b** c*` produce crossed tags that
+    ReportLab rejects; one odd LLM sentence must not fail the whole report.
+    """
+    try:
+        return Paragraph(_inline_markup(text), style)
+    except ValueError:
+        return Paragraph(escape(text), style)
+
+
+def text_to_flowables(content: str) -> List:
+    """Splits plain/markdown text into many small flowables.
+
+    One flowable per paragraph, heading, list and code block keeps ReportLab's
+    wrap/split work proportional to the report length, instead of re-wrapping
+    one giant paragraph on every page break.
+    """
+    styles = get_styles()
+    story: List = []
+    paragraph_lines: List[str] = []
+    list_items: List[str] = []
+    list_type: Optional[str] = None
+    code_lines: Optional[List[str]] = None
+
+    def flush_paragraph() -> None:
+        if paragraph_lines:
+            story.append(_markup_paragraph(" ".join(paragraph_lines), styles["Normal"]))
+            story.append(Spacer(1, 0.08 * inch))
+            paragraph_lines.clear()
+
+    def flush_list() -> None:
+        nonlocal list_type
+        if list_items:
+            items = [ListItem(_markup_paragraph(item, styles["Normal"])) for item in list_items]
+            story.append(ListFlowable(items, bulletType=list_type, leftIndent=0.25 * inch))
+            story.append(Spacer(1, 0.08 * inch))
+            list_items.clear()
+        list_type = None
+
+    for raw_line in content.splitlines():
+        line = raw_line.rstrip()
+
+        if line.strip().startswith("```"):
+            if code_lines is None:
+                flush_paragraph()
+                flush_list()
+                code_lines = []
+            else:
+                story.append(Preformatted("\n".join(code_lines), styles["Code"]))
+                code_lines = None
+            continue
+        if code_lines is not None:
+            code_lines.append(line)
+            continue
+
+        if not line.strip():
+            flush_paragraph()
+            flush_list()
+            continue
+
+        heading = _HEADING_RE.match(line)
+        if heading:
+            flush_paragraph()
+            flush_list()
+            style_name = _HEADING_STYLES.get(len(heading.group(1)), "h4")
+            story.append(_markup_paragraph(heading.group(2), styles[style_name]))
+            continue
+
+        bullet = _BULLET_RE.match(line)
+        numbered = None if bullet else _NUMBERED_RE.match(line)
+        if bullet or numbered:
+            flush_paragraph()
+            item_type = "bullet" if bullet else "1"
+            if list_type and list_type != item_type:
+                flush_list()
+            list_type = item_type
+            list_items.append((bullet or numbered).group(1))
+            continue
+
+        if list_items:
+            # Indented continuation of the previous list item
+            if raw_line[:1].isspace():
+                list_items[-1] += " " + line.strip()
+                continue
+            flush_list()
+        paragraph_lines.append(line.strip())
+
+    if code_lines is not None:
+        story.append(Preformatted("\n".join(code_lines), styles["Code"]))
+    flush_paragraph()
+    flush_list()
+    return story
+
+
+def create_pdf_from_text(content: str, title: str = "Incident Report", images: Optional[List[bytes]] = None) -> bytes:
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, title=title, **get_doc_template_options())
+    styles = get_styles()
     story = []
 
-    story.append(Paragraph(title, styles['h1']))
+    story.append(Paragraph(escape(title), styles['h1']))
     story.append(Spacer(1, 0.2*inch))
-    story.append(Paragraph(content, styles['Normal']))
+    story.extend(text_to_flowables(content))
+
+    if images:
+        story.append(Paragraph("Attachments", styles['h2']))
+        for data in images:
+            try:
+                story.append(image_preview(data))
+                story.append(Spacer(1, 0.1*inch))
+            except Exception as e:
+                print(f"Skipping unreadable attachment image: {e}")
 
     doc.build(story)
     buffer.seek(0)
@@ -23,11 +236,11 @@ def create_pdf_from_html(html_content: str, title: str = "Incident Report") -> b
     from reportlab.platypus import HTML2PDF
 
     buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer)
-    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(buffer, title=title, **get_doc_template_options())
+    styles = get_styles()
     story = []
 
-    story.append(Paragraph(title, styles['h1']))
+    story.append(Paragraph(escape(title), styles['h1']))
     story.append(Spacer(1, 0.2*inch))
 
     for flowable in HTML2PDF(html_content).story:
@@ -36,3 +249,58 @@ def create_pdf_from_html(html_content: str, title: str = "Incident Report") -> b
     doc.build(story)
     buffer.seek(0)
     return buffer.read()
+
+
+class _StreamingStory(list):
+    """A story that pulls flowables from an iterator as ReportLab consumes it.
+
+    `doc.build` only ever looks at the head of the list, so keeping a small
+    look-ahead buffer (for keepWithNext) is enough; the rest of the report
+    is never held in memory.
+    """
+
+    def __init__(self, source: Iterable, lookahead: int = 32) -> None:
+        super().__init__()
+        self._source: Optional[Iterator] = iter(source)
+        self._lookahead = lookahead
+
+    def _fill(self) -> None:
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self) -> int:
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+def _digest_flowables(title: str, reports: Iterable[Dict]) -> Iterator:
+    styles = get_styles()
+    yield Paragraph(escape(title), styles['h1'])
+    yield Spacer(1, 0.2*inch)
+    for report in reports:
+        yield CondPageBreak(2*inch)
+        heading = f"Incident {report.get('incident_id', '')} - {report.get('name', '')}"
+        yield Paragraph(escape(heading), styles['h2'])
+        details = " | ".join(str(report[key]) for key in ('incident_type', 'date') if report.get(key))
+        if details:
+            yield Paragraph(escape(details), styles['Italic'])
+        yield from text_to_flowables(report.get('content', ''))
+        yield Spacer(1, 0.2*inch)
+
+
+def write_digest_pdf(reports: Iterable[Dict], output_path: str, title: str = "Incident Digest") -> int:
+    """Renders many incident summaries into one PDF file, streaming the story.
+
+    `reports` can be a lazy iterator of dicts with 'incident_id', 'name',
+    'incident_type', 'date' and 'content'. Returns the number of pages written.
+    """
+    doc = SimpleDocTemplate(output_path, title=title, **get_doc_template_options())
+    doc.build(_StreamingStory(_digest_flowables(title, reports)))
+    return doc.page
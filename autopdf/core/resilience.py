@@ -0,0 +1,331 @@
+import random
+import threading
+import time
+from core.config import settings
+from core.metrics import Gauge, timed, dependency_duration, dependency_requests
+from typing import Any, Callable, Dict, Optional
+
+
+class DependencyUnavailable(Exception):
+    """Raised instead of calling a dependency that is failing or saturated."""
+
+
+def status_code_of(exc: BaseException) -> Optional[int]:
+    """Best-effort HTTP status of an error from requests, botocore, meilisearch or openai."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):  # botocore ClientError
+        return response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    for source in (exc, response):
+        code = getattr(source, "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True for errors worth retrying: timeouts, connection failures, 429 and 5xx."""
+    if isinstance(exc, DependencyUnavailable):
+        return False
+    code = status_code_of(exc)
+    if code is not None:
+        return code == 429 or code >= 500
+    name = type(exc).__name__.lower()
+    return any(marker in name for marker in ("timeout", "connection", "communication", "throttl"))
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to observed latency (AIMD, Vegas-style signal).
+
+    Every call that completes near the best latency seen so far for its
+    operation grows the limit by 1/limit (about +1 per round trip). A call
+    that is much slower than that baseline, or fails transiently, shrinks it
+    multiplicatively, so a slowing dependency sheds load instead of queueing
+    more of it. Baselines are kept per operation, so a healthy mix of quick
+    metadata calls and slow transfers isn't mistaken for congestion.
+    """
+
+    def __init__(self, name: str, max_limit: int, min_limit: int = 1,
+                 latency_tolerance: float = 3.0, backoff_ratio: float = 0.9) -> None:
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.limit: float = float(self.max_limit)
+        self.in_flight: int = 0
+        self.baseline_latency: Dict[str, float] = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, dropped: bool = False, operation: str = "") -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if dropped:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            else:
+                # Let the baseline drift up slowly so it can follow a permanent shift
+                baseline = self.baseline_latency.get(operation)
+                baseline = latency if baseline is None else min(latency, baseline * 1.01)
+                self.baseline_latency[operation] = baseline
+                if latency > baseline * self.latency_tolerance:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def cancel(self) -> None:
+        """Frees a slot whose call was abandoned; its truncated latency says nothing."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class TokenBudget:
+    """Token bucket refilled continuously up to `tokens_per_minute`."""
+
+    def __init__(self, tokens_per_minute: int) -> None:
+        self.capacity = float(tokens_per_minute)
+        self.available = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def acquire(self, tokens: int, timeout: Optional[float] = None) -> bool:
+        tokens = min(tokens, self.capacity)  # an oversized request still runs, alone
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                self._refill()
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return True
+                wait = (tokens - self.available) * 60.0 / self.capacity
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._condition.wait(wait)
+
+    def refund(self, tokens: int) -> None:
+        """Returns over-estimated tokens (or charges extra when negative)."""
+        with self._condition:
+            self._refill()
+            self.available = min(self.capacity, self.available + tokens)
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """Opens after consecutive transient failures; lets one probe through after a cool-down."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def abandon_probe(self) -> None:
+        """Called when an allowed call never reached the dependency."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"Circuit '{self.name}' closed.")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"Circuit '{self.name}' opened after {self.failures} failures.")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter for the given (1-based) retry attempt."""
+    base = settings.resilience_backoff_base if base is None else base
+    cap = settings.resilience_backoff_max if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class Dependency:
+    """Bulkhead for one external service: circuit breaker, adaptive limit and retries."""
+
+    def __init__(self, name: str, max_concurrency: int, tokens_per_minute: int = 0) -> None:
+        self.name = name
+        self.breaker = CircuitBreaker(name, settings.breaker_failure_threshold, settings.breaker_reset_timeout)
+        self.limiter = AdaptiveLimiter(name, max_concurrency,
+                                       latency_tolerance=settings.limiter_latency_tolerance)
+        self.token_budget: Optional[TokenBudget] = TokenBudget(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    def call(self, fn: Callable[..., Any], *args: Any, operation: Optional[str] = None, **kwargs: Any) -> Any:
+        """Calls `fn`, retrying transient failures with jittered exponential backoff.
+
+        `operation` groups calls with comparable latency for the adaptive
+        limit; it defaults to the name of `fn`.
+        """
+        attempt = 1
+        while True:
+            try:
+                return self.call_once(fn, *args, operation=operation, **kwargs)
+            except Exception as e:
+                if attempt >= settings.resilience_max_attempts or not is_transient(e):
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"{self.name}: transient error ({type(e).__name__}: {e}); "
+                      f"retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def call_once(self, fn: Callable[..., Any], *args: Any, operation: Optional[str] = None, **kwargs: Any) -> Any:
+        """Calls `fn` through the breaker and concurrency limit, without retrying."""
+        operation = operation or getattr(fn, "__name__", "call")
+        if not self.breaker.allow():
+            dependency_requests.inc(dependency=self.name, outcome="rejected")
+            raise DependencyUnavailable(f"{self.name} circuit is open")
+        if not self.limiter.acquire(timeout=settings.resilience_acquire_timeout):
+            self.breaker.abandon_probe()
+            dependency_requests.inc(dependency=self.name, outcome="rejected")
+            raise DependencyUnavailable(f"{self.name} concurrency limit reached")
+
+        start = time.monotonic()
+        try:
+            with timed(self.name, dependency_duration, None, dependency=self.name):
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            transient = is_transient(e)
+            self.limiter.release(time.monotonic() - start, dropped=transient, operation=operation)
+            if transient:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()  # the service answered; the request was at fault
+            dependency_requests.inc(dependency=self.name, outcome="transient_error" if transient else "error")
+            raise
+        self.limiter.release(time.monotonic() - start, operation=operation)
+        self.breaker.record_success()
+        dependency_requests.inc(dependency=self.name, outcome="ok")
+        return result
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Takes a concurrency slot and `tokens` only if both are free right now.
+
+        For optional extra calls such as hedged LLM requests, which should be
+        skipped rather than queued when the dependency is busy or failing.
+        Pair with `release`.
+        """
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            return False
+        if not self.limiter.acquire(timeout=0):
+            return False
+        if self.token_budget and tokens and not self.token_budget.acquire(tokens, timeout=0):
+            self.limiter.cancel()
+            return False
+        return True
+
+    def release(self, latency: Optional[float], error: Optional[BaseException] = None,
+                operation: str = "") -> None:
+        """Returns a slot taken with `try_acquire`; `latency=None` for a cancelled call."""
+        if latency is None:
+            self.limiter.cancel()
+            dependency_requests.inc(dependency=self.name, outcome="cancelled")
+            return
+        transient = error is not None and is_transient(error)
+        self.limiter.release(latency, dropped=transient, operation=operation)
+        if transient:
+            self.breaker.record_failure()
+        outcome = "ok" if error is None else "transient_error" if transient else "error"
+        dependency_requests.inc(dependency=self.name, outcome=outcome)
+
+    def acquire_tokens(self, tokens: int) -> None:
+        if self.token_budget and not self.token_budget.acquire(tokens, timeout=settings.resilience_acquire_timeout):
+            raise DependencyUnavailable(f"{self.name} token budget exhausted")
+
+    def refund_tokens(self, tokens: int) -> None:
+        if self.token_budget:
+            self.token_budget.refund(tokens)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "tokens_available": int(self.token_budget.available) if self.token_budget else None,
+        }
+
+
+_dependencies: Dict[str, Dependency] = {}
+_dependencies_lock = threading.Lock()
+
+
+def dependency(name: str) -> Dependency:
+    """Returns the process-wide bulkhead for 'glpi', 'llm', 'meilisearch' or 'wasabi'."""
+    with _dependencies_lock:
+        if name not in _dependencies:
+            _dependencies[name] = Dependency(
+                name,
+                max_concurrency=getattr(settings, f"{name}_max_concurrency"),
+                tokens_per_minute=settings.llm_tokens_per_minute if name == "llm" else 0,
+            )
+        return _dependencies[name]
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    with _dependencies_lock:
+        return {name: dep.snapshot() for name, dep in _dependencies.items()}
+
+
+def _gauge(field: str) -> Callable[[], Dict]:
+    return lambda: {(name,): float(values[field]) for name, values in snapshot().items()
+                    if values[field] is not None}
+
+
+_BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+Gauge("autopdf_dependency_concurrency_limit", "Current adaptive concurrency limit.", ["dependency"],
+      callback=_gauge("limit"))
+Gauge("autopdf_dependency_in_flight", "Calls currently in flight.", ["dependency"], callback=_gauge("in_flight"))
+Gauge("autopdf_dependency_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ["dependency"],
+      callback=lambda: {(name,): float(_BREAKER_STATES[values["state"]]) for name, values in snapshot().items()})
+Gauge("autopdf_llm_tokens_available", "Tokens left in the LLM per-minute budget.", ["dependency"],
+      callback=_gauge("tokens_available"))
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from core.config import settings
+from core.metrics import record_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SearchCache:
+    """Short-lived in-memory cache of search responses.
+
+    Entries expire after `ttl` seconds. Indexing calls `invalidate()`, which
+    writes a new generation token to a marker file in the data directory;
+    every worker process on the host checks the token on lookup, so new
+    documents are searchable everywhere without waiting for the TTL.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 generation_path: Optional[str] = None) -> None:
+        self.ttl: float = ttl if ttl is not None else settings.search_cache_ttl
+        self.max_entries: int = max_entries if max_entries is not None else settings.search_cache_max_entries
+        self.generation_path: str = generation_path or settings.search_generation_path
+        directory = os.path.dirname(self.generation_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        # key -> (generation, expires_at, value)
+        self._entries: "OrderedDict[str, Tuple[str, float, Any]]" = OrderedDict()
+
+    def generation(self) -> str:
+        try:
+            with open(self.generation_path) as file:
+                return file.read()
+        except FileNotFoundError:
+            return ""
+
+    def get(self, key: str) -> Optional[Any]:
+        generation = self.generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != generation or entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key: str, value: Any, generation: Optional[str] = None) -> None:
+        if self.ttl <= 0:
+            return
+        if generation is None:
+            generation = self.generation()
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def fetch(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Returns the cached value for `key`, calling `loader()` on a miss.
+
+        Concurrent misses for the same key are collapsed into one search, so a
+        burst of identical queries reaches Meilisearch once per TTL.
+        """
+        value = self.get(key)
+        record_cache("search", value is not None)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            value = self.get(key)
+            if value is not None:
+                return value
+            try:
+                # Read before searching, so an invalidation during the search isn't lost
+                generation = self.generation()
+                value = loader()
+                self.put(key, value, generation)
+                return value
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def invalidate(self) -> None:
+        """Drops cached results in this process and, via the marker file, in all others."""
+        directory = os.path.dirname(self.generation_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "w") as file:
+                file.write(uuid.uuid4().hex)
+            os.replace(tmp_path, self.generation_path)
+        except OSError as e:
+            print(f"Error writing search cache generation: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._entries.clear()
+
+
+@lru_cache(maxsize=None)
+def get_search_cache() -> SearchCache:
+    """Process-wide cache, created on first use."""
+    return SearchCache()
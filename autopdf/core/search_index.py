@@ -0,0 +1,37 @@
+from core.config import settings
+from core.manifest import get_manifest_index
+from core.meilisearch_client import get_meilisearch_client
+from core.search_cache import get_search_cache
+from typing import Any, Optional
+
+INCIDENT_INDEX = "glpi_incidents"
+
+
+def publish(task: Any) -> None:
+    """Waits until Meilisearch has applied `task`, then drops cached /search results.
+
+    Meilisearch queues writes, so invalidating straight away would let a
+    search in between cache the old results under the new generation.
+    """
+    get_meilisearch_client().wait_for_task(task, settings.meilisearch_task_timeout)
+    get_search_cache().invalidate()
+
+
+def sync_status(incident_id: int, status: Optional[Any]) -> bool:
+    """Sets `status` on the latest indexed version of an incident, if it changed.
+
+    Status is left out of the pipeline and store fingerprints, so a
+    status-only update skips the pipeline; this keeps the status filter and
+    facet of /search current anyway. Returns True if the index was updated.
+    """
+    entry = get_manifest_index().latest(incident_id)
+    if entry is None:
+        return False
+    client = get_meilisearch_client()
+    doc_id = f"{incident_id}-{entry['version']}"
+    document = client.get_document(INCIDENT_INDEX, doc_id)
+    if document is None or dict(document).get("status") == status:
+        return False
+    publish(client.update_document(INCIDENT_INDEX, {"id": doc_id, "status": status}))
+    print(f"Status of incident {incident_id} updated in the search index.")
+    return True
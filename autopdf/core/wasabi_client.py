@@ -1,8 +1,12 @@
 import boto3
 import io
+from botocore.config import Config
 from core.config import settings
+from core.resilience import dependency
+from core.metrics import bytes_uploaded
 from botocore.exceptions import ClientError
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, Dict, Iterator
 
 class WasabiClient:
     def __init__(self) -> None:
@@ -11,35 +15,61 @@ class WasabiClient:
             endpoint_url=settings.wasabi_endpoint,  # Using settings
             aws_access_key_id=settings.wasabi_access_key,  # Using settings
             aws_secret_access_key=settings.wasabi_secret_key,  # Using settings
+            # Retries happen in `self.resilience`, where the breaker and limiter see them
+            config=Config(retries={"total_max_attempts": 1}),
         )
+        self.resilience = dependency("wasabi")
 
     def upload_document(self, bucket_name: str, object_name: str, data: bytes) -> None:
         try:
             try:
-                self.client.head_bucket(Bucket=bucket_name)
+                self.resilience.call(self.client.head_bucket, Bucket=bucket_name)
             except ClientError:
                 self.client.create_bucket(Bucket=bucket_name,
                                           CreateBucketConfiguration={'LocationConstraint': 'ap-northeast-1'}) #wasabi bucket region
 
-            data_stream = io.BytesIO(data)
-            self.client.upload_fileobj(data_stream, bucket_name, object_name)
+            self.resilience.call(self._upload, data, bucket_name, object_name)
+            bytes_uploaded.inc(len(data))
             print(f"Uploaded {object_name} to {bucket_name}")
 
         except ClientError as e:
             print(f"Error uploading to Wasabi: {e}")
             raise
 
+    def _upload(self, data: bytes, bucket_name: str, object_name: str) -> None:
+        # A fresh stream per attempt, so a retry doesn't resume from a consumed buffer
+        self.client.upload_fileobj(io.BytesIO(data), bucket_name, object_name)
+
+    def _read(self, bucket_name: str, object_name: str) -> bytes:
+        response = self.client.get_object(Bucket=bucket_name, Key=object_name)
+        return response['Body'].read()
+
     def get_document(self, bucket_name: str, object_name: str) -> bytes:
         try:
-            response = self.client.get_object(Bucket=bucket_name, Key=object_name)
-            return response['Body'].read()
+            return self.resilience.call(self._read, bucket_name, object_name)
         except ClientError as e:
             print(f"Error downloading from Wasabi: {e}")
             return b""
 
+    def download_to_file(self, bucket_name: str, object_name: str, file_path: str) -> None:
+        """Streams an object straight to disk instead of reading it into memory."""
+        try:
+            self.resilience.call(self.client.download_file, bucket_name, object_name, file_path)
+        except ClientError as e:
+            print(f"Error downloading from Wasabi: {e}")
+            raise
+
+    def generate_presigned_url(self, bucket_name: str, object_name: str, expires_in: int = 3600) -> str:
+        """Signs a time-limited GET URL locally; no request is made to Wasabi."""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket_name, 'Key': object_name},
+            ExpiresIn=expires_in,
+        )
+
     def document_exists(self, bucket_name: str, object_name: str) -> bool:
         try:
-            self.client.head_object(Bucket=bucket_name, Key=object_name)
+            self.resilience.call(self.client.head_object, Bucket=bucket_name, Key=object_name)
             return True
         except ClientError as e:
             if e.response['Error']['Code'] == '404':
@@ -47,23 +77,53 @@ class WasabiClient:
             else:
                 print(f"Error checking document existence: {e}")
                 return False
+    def iter_objects(self, bucket_name: str, prefix: str = None, recursive: bool = False) -> Iterator[Dict]:
+        """Streams object entries (Key, Size, ETag, LastModified) page by page."""
+        for entry in self.iter_listing(bucket_name, prefix, recursive):
+            if 'Key' in entry:
+                yield entry
+
+    def iter_prefixes(self, bucket_name: str, prefix: str = None) -> Iterator[str]:
+        """Streams the common prefixes ("directories") directly below a prefix."""
+        for entry in self.iter_listing(bucket_name, prefix, recursive=False):
+            if 'Prefix' in entry:
+                yield entry['Prefix']
+
+    def iter_listing(self, bucket_name: str, prefix: str = None, recursive: bool = False) -> Iterator[Dict]:
+        """Streams a bucket listing without materialising it.
+
+        Yields object entries (dicts with a 'Key') and, for non-recursive
+        listings, common prefix entries (dicts with a 'Prefix').
+        """
+        paginator = self.client.get_paginator('list_objects_v2')
+        params = {'Bucket': bucket_name}
+        if prefix:
+            params['Prefix'] = prefix
+        if not recursive:
+            params['Delimiter'] = '/'  # For non-recursive
+
+        # Pages are fetched lazily; retrying a half-consumed paginator isn't safe
+        pages = iter(paginator.paginate(**params))
+        while True:
+            page = self.resilience.call_once(next, pages, None)
+            if page is None:
+                return
+            for common_prefix in page.get('CommonPrefixes', []):
+                yield common_prefix
+            for obj in page.get('Contents', []):
+                yield obj
+
     def list_objects(self, bucket_name: str, prefix: str = None, recursive: bool = False) -> List[str]:
         """Lists objects in a bucket."""
         try:
-            paginator = self.client.get_paginator('list_objects_v2')
-            params = {'Bucket': bucket_name}
-            if prefix:
-                params['Prefix'] = prefix
-            if not recursive:
-                params['Delimiter'] = '/'  # For non-recursive
-
-            object_names = []
-            for page in paginator.paginate(**params):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        object_names.append(obj['Key'])
-            return object_names
+            return [obj['Key'] for obj in self.iter_objects(bucket_name, prefix, recursive)]
 
         except ClientError as e:
             print(f"Error listing objects in Wasabi: {e}")
             return []
+
+
+@lru_cache(maxsize=None)
+def get_wasabi_client() -> WasabiClient:
+    """Process-wide client, created on first use."""
+    return WasabiClient()
@@ -1,5 +1,13 @@
-from .rag_graph import rag_app
+from .rag_graph import get_rag_app
+
+
+def __getattr__(name: str):
+    if name == "rag_app":
+        return get_rag_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
+    "get_rag_app",
     "rag_app"
 ]
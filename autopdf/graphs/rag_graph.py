@@ -1,12 +1,11 @@
 from langchain_core.runnables import RunnablePassthrough
 from langgraph.graph import StateGraph, END
 from core.llm_utils import generate_text
-from core.meilisearch_client import MeilisearchClient
+from core.meilisearch_client import get_meilisearch_client
 from core.config import settings
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 
-meilisearch_client = MeilisearchClient()
-
 class RAGState:
     def __init__(self) -> None:
         self.processed_data: Dict = {}
@@ -20,7 +19,7 @@ def retrieve_node(state: RAGState) -> Dict[str, Any]:
     query = state.query
     processed_data = state.processed_data
     
-    retrieved_docs = meilisearch_client.search(
+    retrieved_docs = get_meilisearch_client().search(
         index_name="glpi_incidents",
         query=query,
         limit=5
@@ -66,20 +65,29 @@ def check_node(state: RAGState) -> Dict[str, bool]:
 def finalize_node(state: RAGState) -> RAGState:
     return state
 
-# Create and configure the workflow
-workflow = StateGraph(RAGState)
-workflow.add_node("retrieve", retrieve_node)
-workflow.add_node("generate", generate_node)
-workflow.add_node("check", check_node)
-workflow.add_node("finalize", finalize_node)
+@lru_cache(maxsize=None)
+def get_rag_app():
+    """Builds and compiles the RAG workflow on first use."""
+    workflow = StateGraph(RAGState)
+    workflow.add_node("retrieve", retrieve_node)
+    workflow.add_node("generate", generate_node)
+    workflow.add_node("check", check_node)
+    workflow.add_node("finalize", finalize_node)
+
+    workflow.set_entry_point("retrieve")
+    workflow.add_edge("retrieve", "generate")
+    workflow.add_edge("generate", "check")
+    workflow.add_conditional_edges(
+        "check",
+        lambda x: "retrieve" if not x["done"] else "finalize",
+    )
+    workflow.add_edge("finalize", END)
+
+    return workflow.compile()
 
-workflow.set_entry_point("retrieve")
-workflow.add_edge("retrieve", "generate")
-workflow.add_edge("generate", "check")
-workflow.add_conditional_edges(
-    "check",
-    lambda x: "retrieve" if not x["done"] else "finalize",
-)
-workflow.add_edge("finalize", END)
 
-rag_app = workflow.compile()
+def __getattr__(name: str):
+    # `rag_app` used to be compiled at import time
+    if name == "rag_app":
+        return get_rag_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,29 +1,207 @@
-from crewai import Crew, Task, Process
-from agents.data_extractor import DataExtractorAgent
-from agents.data_processor import DataProcessorAgent
-from agents.query_handler import QueryHandlerAgent
-from agents.pdf_generator import PDFGeneratorAgent
-from agents.search_indexer import SearchIndexerAgent
 from core.glpi import GLPIClient
 from core.config import settings
-from typing import Dict
-from fastapi import FastAPI, Request, HTTPException
+from core.manifest import get_manifest_index
+from core.blob_cache import BlobCache
+from core.fingerprints import fingerprint, get_fingerprint_store
+from core.metrics import Gauge, timed, trace_run, start_flusher, render as render_metrics
+from core.resilience import DependencyUnavailable
+from core.search_cache import get_search_cache
+from typing import Any, Dict, List, NamedTuple, Optional
+from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.responses import RedirectResponse, FileResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from contextlib import asynccontextmanager
+from core.job_queue import JobQueue, JobWorker
 from datetime import datetime
+from functools import lru_cache
+import base64
+import binascii
+import json
+import os
+import threading
+import time
 
-app = FastAPI()
+# crewai, langchain, langgraph, unstructured, boto3 and reportlab are only
+# imported when a pipeline first runs (or by the optional warm-up), so the
+# API starts quickly and doesn't depend on GLPI being reachable.
 
-# Initialize GLPI client
-glpi_client = GLPIClient()
 
-# Initialize agents
-data_extractor_agent = DataExtractorAgent(glpi_client)
-data_processor_agent = DataProcessorAgent()
-query_handler_agent = QueryHandlerAgent()
-pdf_generator_agent = PDFGeneratorAgent()
-search_indexer_agent = SearchIndexerAgent()
+class PipelineAgents(NamedTuple):
+    data_extractor: Any
+    data_processor: Any
+    query_handler: Any
+    pdf_generator: Any
+    search_indexer: Any
+
+
+_glpi_clients = threading.local()
+
+
+def get_glpi_client() -> GLPIClient:
+    """GLPI client of the calling thread; the session is opened by its first request.
+
+    Every run closes its session when it ends, so concurrent runs (queue
+    worker threads, benchmark threads) must not share a client.
+    """
+    client = getattr(_glpi_clients, "client", None)
+    if client is None:
+        client = _glpi_clients.client = GLPIClient()
+    return client
+
+
+@lru_cache(maxsize=None)
+def get_agents() -> PipelineAgents:
+    """Imports the agent modules and builds the crew's agents on first use."""
+    from agents.data_extractor import DataExtractorAgent
+    from agents.data_processor import DataProcessorAgent
+    from agents.query_handler import QueryHandlerAgent
+    from agents.pdf_generator import PDFGeneratorAgent
+    from agents.search_indexer import SearchIndexerAgent
+
+    return PipelineAgents(
+        data_extractor=DataExtractorAgent(get_glpi_client),
+        data_processor=DataProcessorAgent(),
+        query_handler=QueryHandlerAgent(),
+        pdf_generator=PDFGeneratorAgent(),
+        search_indexer=SearchIndexerAgent(),
+    )
+
+
+def warm_up() -> None:
+    """Loads the pipeline's modules, agents, clients, PDF fonts and render pool ahead of the first job."""
+    from graphs.rag_graph import get_rag_app
+    from core.meilisearch_client import get_meilisearch_client
+    from core.wasabi_client import get_wasabi_client
+    from core.pdf_utils import get_styles
+    from core.pdf_service import warm_pool
+
+    start = time.monotonic()
+    get_agents()
+    get_rag_app()
+    get_meilisearch_client()
+    get_wasabi_client()
+    get_styles()
+    warm_pool()
+    print(f"Warm-up finished in {time.monotonic() - start:.1f}s")
+
+
+def prepare_search_index() -> None:
+    """Creates the incident index and its filterable attributes, so /search never has to."""
+    from core.meilisearch_client import get_meilisearch_client, INCIDENT_FILTERABLE_ATTRIBUTES
+
+    try:
+        client = get_meilisearch_client()
+        client.create_index("glpi_incidents")
+        client.ensure_filterable("glpi_incidents", INCIDENT_FILTERABLE_ATTRIBUTES)
+    except Exception as e:
+        print(f"Could not prepare the search index, indexing will retry: {e}")
+
+
+def start_consumers(workers: List[JobWorker], stopping: threading.Event) -> None:
+    """Optionally warms up, then starts the queue consumers, unless shutdown began meanwhile."""
+    if settings.warm_up_on_startup:
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"Warm-up failed, continuing with lazy initialisation: {e}")
+    for worker in workers:
+        if stopping.is_set():
+            return
+        worker.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Starts the queue consumers for this process, after an optional warm-up.
+
+    uvicorn binds its socket only once startup returns, so the warm-up runs
+    in a background thread and the API serves requests while it does;
+    consumers start afterwards, so the first job doesn't pay the import cost.
+    """
+    start_flusher()
+    # In the background: a Meilisearch outage mustn't hold up startup
+    threading.Thread(target=prepare_search_index, name="prepare-search-index", daemon=True).start()
+    workers = [JobWorker(job_queue, process_job) for _ in range(settings.queue_worker_threads)]
+    stopping = threading.Event()
+    threading.Thread(target=start_consumers, args=(workers, stopping), name="start-consumers", daemon=True).start()
+    yield
+    stopping.set()
+    for worker in workers:
+        worker.stop()
+    for worker in workers:
+        if worker.ident is not None:
+            worker.join(timeout=5)
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Read path: served from the local manifest and blob cache, not bucket listings
+manifest_index = get_manifest_index()
+blob_cache = BlobCache()
+
+# Durable job store shared by every worker process on this host
+job_queue = JobQueue()
+
+Gauge("autopdf_queue_jobs", "Jobs in the shared queue by status.", ["status"],
+      callback=lambda: {(status,): float(count) for status, count in job_queue.stats().items()},
+      shared=True)
+
+@timed("fingerprint")
+def ticket_fingerprint(incident_id: int, incident: Optional[Dict] = None) -> str:
+    """Fingerprints the GLPI fields that feed the report.
+
+    Assignee, status and other bookkeeping fields are left out, so update
+    events that only touch those don't re-run the pipeline; a changed status
+    is written to the search index by `sync_status` instead.
+    """
+    glpi_client = get_glpi_client()
+    if incident is None:
+        incident = glpi_client.get_incident(incident_id)
+    tasks = glpi_client.get_ticket_tasks(incident_id) or []
+    return fingerprint(
+        incident.get('name'),
+        incident.get('content'),
+        glpi_client.get_ticket_solution(incident_id),
+        [(task.get('id'), task.get('content')) for task in tasks],
+        glpi_client.get_ticket_documents(incident_id),
+    )
+
 
 def run_autopdf(incident_id: int, update_solution : bool = False) -> str:
     """Runs the AutoPDF workflow for a given incident ID."""
+    with trace_run("pipeline", incident_id=incident_id, update_solution=update_solution):
+        return _run_autopdf(incident_id, update_solution)
+
+
+def _run_autopdf(incident_id: int, update_solution : bool = False) -> str:
+    glpi_client = get_glpi_client()
+    try:
+        return _run_pipeline(glpi_client, incident_id, update_solution)
+    finally:
+        # Also when GLPI fails while fingerprinting, so the session isn't left open
+        glpi_client.close_session()
+
+
+def _run_pipeline(glpi_client: GLPIClient, incident_id: int, update_solution: bool) -> str:
+    fingerprint_store = get_fingerprint_store()
+    incident = glpi_client.get_incident(incident_id)
+    pipeline_fingerprint = ticket_fingerprint(incident_id, incident)
+    cached_result = fingerprint_store.lookup(incident_id, "pipeline", pipeline_fingerprint)
+    if cached_result is not None:
+        print(f"Incident {incident_id} unchanged since the last successful run; skipping.")
+        from core.search_index import sync_status
+        sync_status(incident_id, incident.get('status'))
+        return cached_result
+
+    from crewai import Crew, Task, Process
+
+    pipeline_agents = get_agents()
+    data_extractor_agent = pipeline_agents.data_extractor
+    data_processor_agent = pipeline_agents.data_processor
+    query_handler_agent = pipeline_agents.query_handler
+    pdf_generator_agent = pipeline_agents.pdf_generator
+    search_indexer_agent = pipeline_agents.search_indexer
+
     extract_incident_task = Task(
         description=f"Extract details for GLPI incident ID {incident_id}",
         agent=data_extractor_agent,
@@ -71,7 +249,9 @@ def run_autopdf(incident_id: int, update_solution : bool = False) -> str:
         agent=pdf_generator_agent,
         tools=[pdf_generator_agent.create_pdf_from_text_tool_method],
         expected_output="PDF file as bytes.",
-        function=lambda x: pdf_generator_agent.create_pdf_from_text_tool_method(content=x, title=f"Incident Report - {incident_id}"),
+        function=lambda x: pdf_generator_agent.create_pdf_from_text_tool_method(
+            content=x, title=f"Incident Report - {incident_id}",
+            images=glpi_client.get_ticket_images(incident_id, settings.pdf_max_images) if settings.pdf_max_images else None),
         context=[generate_content_task]
     )
     index_pdf_task = Task(
@@ -104,18 +284,22 @@ def run_autopdf(incident_id: int, update_solution : bool = False) -> str:
         verbose=2
     )
 
-    try:
-        result = crew.kickoff()
-        if update_solution:
-            solution_update_result = glpi_client.update_ticket_solution(incident_id, result['generated_content'])
-            if solution_update_result:
-                 print(f"Solution for incident {incident_id} updated successfully.")
-            else:
-                 print(f"Failed to update solution for incident {incident_id}.")
-        return result
+    result = crew.kickoff()
+    if update_solution:
+        solution_update_result = glpi_client.update_ticket_solution(incident_id, result['generated_content'])
+        if solution_update_result:
+             print(f"Solution for incident {incident_id} updated successfully.")
+             # Our own write changes the solution; fingerprint the ticket as it now is
+             pipeline_fingerprint = ticket_fingerprint(incident_id)
+        else:
+             print(f"Failed to update solution for incident {incident_id}.")
+    fingerprint_store.record(incident_id, "pipeline", pipeline_fingerprint, str(result))
+    return result
 
-    finally:
-        glpi_client.close_session()
+
+def process_job(job: Dict) -> None:
+    """Runs a leased queue job; exceptions make the queue retry it."""
+    run_autopdf(job['incident_id'], update_solution=job['update_solution'])
 
 
 @app.post("/webhook")
@@ -128,6 +312,8 @@ async def glpi_webhook(request: Request):
         if not isinstance(data, list):
             raise HTTPException(status_code=400, detail="Invalid webhook payload format")
 
+        job_ids = []
+
         for event in data:
             if 'event' not in event or 'itemtype' not in event or 'items_id' not in event:
                 raise HTTPException(status_code=400, detail="Missing required fields in event")
@@ -139,22 +325,198 @@ async def glpi_webhook(request: Request):
                     print("*"*50)
                     print(f"Received event: {event['event']} for Ticket ID: {incident_id}")
                     print("*"*50)
-                    if event['event'] == 'update':
-                         run_autopdf(incident_id, update_solution = True)
-                    else:
-                         run_autopdf(incident_id, update_solution = False)
+                    job_id = job_queue.enqueue(incident_id, update_solution=event['event'] == 'update')
+                    job_ids.append(job_id)
                 else:
                     print(f"Ignoring event type: {event['event']} for Ticket")
 
-        return {"message": "Webhook received and processed"}
+        return {"message": "Webhook received and queued", "job_ids": job_ids}
 
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in webhook: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
+@app.get("/reports/{incident_id}/versions")
+async def list_report_versions(incident_id: int):
+    """Lists the known PDF versions of an incident, newest first."""
+    versions = manifest_index.versions(incident_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail=f"No reports found for incident {incident_id}")
+    return {
+        "incident_id": incident_id,
+        "versions": [
+            {
+                "version": entry["version"],
+                "object_name": entry["object_name"],
+                "size": entry["size"],
+                "recorded_at": entry["recorded_at"],
+            }
+            for entry in versions
+        ],
+    }
+
+
+@app.get("/reports/{incident_id}")
+def get_report(incident_id: int, version: Optional[str] = None, stream: bool = False):
+    """Returns the latest (or a given) PDF version of an incident.
+
+    By default redirects to a presigned Wasabi URL. With `stream=true` the PDF
+    is served from the local blob cache, which supports range requests.
+    """
+    if version:
+        entry = manifest_index.get(incident_id, version)
+    else:
+        entry = manifest_index.latest(incident_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail=f"No report found for incident {incident_id}")
+
+    from core.wasabi_client import get_wasabi_client
+    from botocore.exceptions import ClientError
+
+    wasabi_client = get_wasabi_client()
+    object_name = entry["object_name"]
+    if not stream:
+        url = wasabi_client.generate_presigned_url(settings.bucket_name, object_name, settings.presigned_url_ttl)
+        return RedirectResponse(url, status_code=307)
+
+    try:
+        # A private link, so evicting the cache entry can't pull the file from under the response
+        path = blob_cache.checkout(
+            object_name,
+            lambda tmp_path: wasabi_client.download_to_file(settings.bucket_name, object_name, tmp_path),
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            raise HTTPException(status_code=404, detail=f"Report {entry['version']} of incident {incident_id} "
+                                                        "is missing from storage")
+        raise HTTPException(status_code=502, detail="Could not fetch the report from storage")
+    except DependencyUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"incident_{incident_id}_{entry['version']}.pdf",
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+# Index fields that /search may return, and those returned when `fields` isn't given
+SEARCH_FIELDS = ["id", "incident_id", "incident_type", "status", "version", "object_name", "name",
+                 "content", "solution", "tasks", "date", "updated_at", "pdf_size"]
+SEARCH_DEFAULT_FIELDS = ["incident_id", "incident_type", "status", "version", "name", "content", "date"]
+SEARCH_FACETS = ["incident_type", "status"]
+
+
+def _filter_values(values: List[str]) -> str:
+    return ", ".join('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values)
+
+
+def _search_filter(incident_type: Optional[List[str]], status: Optional[List[str]],
+                   exclude_incident_id: Optional[int]) -> Optional[str]:
+    """Builds a Meilisearch filter expression from the query parameters, quoting every value."""
+    clauses = []
+    if incident_type:
+        clauses.append(f"incident_type IN [{_filter_values(incident_type)}]")
+    if status:
+        clauses.append(f"status IN [{_filter_values(status)}]")
+    if exclude_incident_id is not None:
+        clauses.append(f"incident_id != {exclude_incident_id}")
+    return " AND ".join(clauses) or None
+
+
+def _encode_cursor(offset: int, query_key: str) -> str:
+    payload = json.dumps({"offset": offset, "query": query_key[:16]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, query_key: str) -> int:
+    """Returns the offset a cursor points at; it must come from the same query."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(payload["offset"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("query") != query_key[:16] or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this query")
+    return offset
+
+
+@app.get("/search")
+def search_incidents(
+    q: str = "",
+    incident_type: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    exclude_incident_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    limit: int = Query(20, ge=1),
+    cursor: Optional[str] = None,
+    facets: bool = True,
+):
+    """Searches the indexed incident reports, e.g. for "similar past incidents".
+
+    `incident_type` and `status` may be repeated and are OR-ed within each
+    field. `fields` is a comma-separated projection. Pass `next_cursor` back as
+    `cursor` for the next page. Results are cached for a few seconds and
+    dropped as soon as new reports are indexed.
+    """
+    from core.meilisearch_client import get_meilisearch_client
+    import meilisearch
+
+    limit = min(limit, settings.search_max_limit)
+    projection = SEARCH_DEFAULT_FIELDS
+    if fields:
+        projection = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = sorted(set(projection) - set(SEARCH_FIELDS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    search_filter = _search_filter(incident_type, status, exclude_incident_id)
+    facet_names = SEARCH_FACETS if facets else None
+    query_key = fingerprint("glpi_incidents", q, search_filter, facet_names, projection, limit)
+    offset = _decode_cursor(cursor, query_key) if cursor else 0
+
+    def load() -> Dict:
+        return get_meilisearch_client().search_page("glpi_incidents", q, search_filter, facet_names, projection, offset, limit)
+
+    try:
+        result = get_search_cache().fetch(f"{query_key}:{offset}", load)
+    except DependencyUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (meilisearch.errors.MeilisearchCommunicationError, meilisearch.errors.MeilisearchTimeoutError) as e:
+        print(f"Meilisearch unreachable: {e}")
+        raise HTTPException(status_code=503, detail="Search is temporarily unavailable")
+    except meilisearch.errors.MeilisearchApiError as e:
+        print(f"Meilisearch API Error: {e}")
+        raise HTTPException(status_code=502, detail=f"Search failed: {e.code}")
+
+    hits = result.get("hits", [])
+    total = result.get("estimatedTotalHits", 0)
+    next_offset = offset + len(hits)
+    return {
+        "query": q,
+        "hits": hits,
+        "facets": result.get("facetDistribution", {}) if facets else None,
+        "estimated_total": total,
+        "next_cursor": _encode_cursor(next_offset, query_key) if len(hits) == limit and next_offset < total else None,
+    }
+
+
+@app.get("/queue")
+async def queue_status():
+    """Job counts by status, plus the most recent dead letters."""
+    return {"counts": job_queue.stats(), "dead_letters": job_queue.dead_letters(limit=20)}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for every API and queue worker process on this host."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     return {"message": "AutoPDF is running!"}
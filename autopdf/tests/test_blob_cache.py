@@ -0,0 +1,46 @@
+import os
+import time
+
+from core.blob_cache import BlobCache
+
+
+def writer(data):
+    def load(tmp_path):
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+    return load
+
+
+def test_checkout_survives_eviction(tmp_path):
+    cache = BlobCache(str(tmp_path), max_bytes=10)
+    link = cache.checkout("a", writer(b"12345678"))
+    cache.fetch("b", writer(b"abcdefgh"))  # evicts "a"
+    assert cache.get("a") is None
+    with open(link, "rb") as file:
+        assert file.read() == b"12345678"
+    os.remove(link)
+
+
+def test_stale_checkouts_are_removed_on_start(tmp_path):
+    cache = BlobCache(str(tmp_path))
+    fresh = cache.checkout("a", writer(b"data"))
+    old = int(time.time() - 2 * BlobCache.CHECKOUT_MAX_AGE)
+    stale = str(tmp_path / f"{os.path.basename(cache.get('a'))}.{old}_0000.serving")
+    os.link(cache.get("a"), stale)
+
+    BlobCache(str(tmp_path))
+    assert os.path.exists(fresh)
+    assert not os.path.exists(stale)
+
+
+def test_blob_stored_by_another_process_is_a_hit(tmp_path):
+    first = BlobCache(str(tmp_path))
+    second = BlobCache(str(tmp_path))
+    first.fetch("a", writer(b"12345678"))
+
+    def fail(tmp_path):
+        raise AssertionError("downloaded again")
+
+    with open(second.fetch("a", fail), "rb") as file:
+        assert file.read() == b"12345678"
+    assert second.total_bytes == 8
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+import main
+from core.fingerprints import FingerprintStore, fingerprint
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FingerprintStore(str(tmp_path / "fingerprints.db"))
+
+
+def test_fingerprint_is_stable_and_hashes_bytes():
+    assert fingerprint("a", [1, 2], {"b": 1}) == fingerprint("a", [1, 2], {"b": 1})
+    assert fingerprint(b"pdf") == fingerprint(bytearray(b"pdf")) != fingerprint("pdf")
+
+
+def test_lookup_only_hits_on_the_same_fingerprint(store):
+    store.record(1, "generate", "f1", "summary")
+    assert store.lookup(1, "generate", "f1") == "summary"
+    assert store.lookup(1, "generate", "f2") is None
+    assert store.lookup(2, "generate", "f1") is None
+
+
+def test_prune_drops_old_outputs_of_one_stage(store):
+    store.record("document:a", "partition", "a", "text")
+    store.record(1, "generate", "f1", "summary")
+    store._conn.execute("UPDATE stage_runs SET updated_at = '2000-01-01T00:00:00'")
+    store._conn.commit()
+    assert store.prune("partition", 3600) == 1
+    assert store.lookup("document:a", "partition", "a") is None
+    assert store.lookup(1, "generate", "f1") == "summary"
+
+
+def test_render_rows_are_dropped_once(tmp_path):
+    path = str(tmp_path / "fingerprints.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE stage_runs (scope TEXT NOT NULL, stage TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+                 "output_text TEXT, output_blob BLOB, updated_at TEXT NOT NULL, PRIMARY KEY (scope, stage))")
+    conn.execute("INSERT INTO stage_runs VALUES ('Report', 'render', 'f', NULL, x'00', '2024-01-01')")
+    conn.commit()
+    conn.close()
+
+    store = FingerprintStore(path)
+    assert store._conn.execute("SELECT COUNT(*) FROM stage_runs").fetchone()[0] == 0
+    store.record("Report", "render", "f", "kept")
+    assert FingerprintStore(path).lookup("Report", "render", "f") == "kept"
+
+
+class FakeGLPI:
+    def __init__(self):
+        self.calls = []
+
+    def get_incident(self, incident_id):
+        return {"id": incident_id, "name": "Printer", "content": "<p>Jammed</p>", "status": 2}
+
+    def get_ticket_tasks(self, incident_id):
+        return []
+
+    def get_ticket_solution(self, incident_id):
+        return None
+
+    def get_ticket_documents(self, incident_id):
+        return []
+
+
+def test_unchanged_ticket_skips_the_pipeline(store, monkeypatch):
+    glpi = FakeGLPI()
+    synced = []
+    monkeypatch.setattr(main, "get_glpi_client", lambda: glpi)
+    monkeypatch.setattr(main, "get_fingerprint_store", lambda: store)
+    monkeypatch.setattr(main, "get_agents", lambda: pytest.fail("agents (LLM, partitioning) were used"))
+    monkeypatch.setattr("core.search_index.sync_status", lambda incident_id, status: synced.append(status))
+    store.record(7, "pipeline", main.ticket_fingerprint(7), "previous result")
+
+    assert main._run_pipeline(glpi, 7, False) == "previous result"
+    assert synced == [2]
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from core.job_queue import DEAD, DONE, LEASED, QUEUED, JobQueue, JobWorker
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr("core.job_queue.settings.queue_retry_base_delay", 10.0)
+    monkeypatch.setattr("core.job_queue.settings.queue_retry_max_delay", 60.0)
+    return JobQueue(str(tmp_path / "jobs.db"), visibility_timeout=0.05, max_attempts=2)
+
+
+def test_lease_and_complete(queue):
+    job_id = queue.enqueue(1)
+    job = queue.lease("a")
+    assert job["id"] == job_id and job["attempts"] == 1
+    assert queue.lease("b") is None
+    queue.complete(job_id, "a")
+    assert queue.stats()[DONE] == 1
+
+
+def test_enqueue_coalesces_unstarted_jobs(queue):
+    first = queue.enqueue(1)
+    assert queue.enqueue(1, update_solution=True) == first
+    assert queue.lease("a")["update_solution"] is True
+
+
+def test_one_lease_per_incident(queue):
+    queue.enqueue(1)
+    queue.lease("a")
+    queue.enqueue(1)
+    queue.enqueue(2)
+    assert queue.lease("b")["incident_id"] == 2
+    assert queue.lease("c") is None
+
+
+def test_failure_backs_off_then_dead_letters(queue, monkeypatch):
+    monkeypatch.setattr("core.job_queue.random.uniform", lambda low, high: high)
+    job_id = queue.enqueue(1)
+    queue.lease("a")
+    assert queue.fail(job_id, "a", "boom") == QUEUED
+    assert queue.lease("a") is None  # backing off for 10 s
+
+    with queue._lock:
+        queue._conn.execute("UPDATE jobs SET available_at = 0 WHERE id = ?", (job_id,))
+    assert queue.lease("a")["attempts"] == 2
+    assert queue.fail(job_id, "a", "boom again") == DEAD
+    assert [job["last_error"] for job in queue.dead_letters()] == ["boom again"]
+
+    queue.requeue(job_id)
+    assert queue.lease("a")["attempts"] == 1
+
+
+def test_backoff_is_capped(monkeypatch):
+    monkeypatch.setattr("core.job_queue.random.uniform", lambda low, high: high)
+    monkeypatch.setattr("core.job_queue.settings.queue_retry_base_delay", 10.0)
+    monkeypatch.setattr("core.job_queue.settings.queue_retry_max_delay", 60.0)
+    assert [JobQueue.backoff(n) for n in (1, 2, 3, 4, 5)] == [10.0, 20.0, 40.0, 60.0, 60.0]
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job_id = queue.enqueue(1)
+    queue.lease("a")
+    time.sleep(0.06)
+    job = queue.lease("b")
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not queue.heartbeat(job_id, "a")
+    assert queue.fail(job_id, "a", "late") == LEASED  # the old owner no longer decides
+
+
+def test_poison_job_is_dead_lettered_when_leases_keep_expiring(queue):
+    job_id = queue.enqueue(1)
+    for _ in range(5):
+        queue.lease("crashing-worker")
+        time.sleep(0.06)
+    assert queue.lease("next") is None
+    assert queue.stats() == {QUEUED: 0, LEASED: 0, DONE: 0, DEAD: 1}
+    dead = queue.dead_letters()[0]
+    assert dead["id"] == job_id and dead["attempts"] == 2
+    assert "Lease expired" in dead["last_error"]
+
+
+def test_idle_worker_purges_old_finished_jobs(queue, monkeypatch):
+    monkeypatch.setattr("core.job_queue.settings.queue_done_retention", 0.0)
+    monkeypatch.setattr("core.job_queue.settings.queue_purge_interval", 3600.0)
+    done_id = queue.enqueue(1)
+    queue.lease("a")
+    queue.complete(done_id, "a")
+    queue.enqueue(2)
+
+    worker = JobWorker(queue, lambda job: None)
+    worker._purge_if_due()
+    assert queue.stats()[DONE] == 0
+    assert queue.stats()[QUEUED] == 1
+
+    job = queue.lease("a")
+    queue.complete(job["id"], "a")
+    worker._purge_if_due()  # not due again for an hour
+    assert queue.stats()[DONE] == 1
@@ -0,0 +1,50 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+class FakeWorker:
+    started = []
+
+    def __init__(self, queue, handler):
+        self.ident = None
+
+    def start(self):
+        self.ident = 1
+        FakeWorker.started.append(self)
+
+    def stop(self):
+        pass
+
+    def join(self, timeout=None):
+        pass
+
+
+def test_server_answers_while_warming_up(monkeypatch):
+    release = threading.Event()
+    warmed = threading.Event()
+
+    def slow_warm_up():
+        release.wait(5)
+        warmed.set()
+
+    FakeWorker.started = []
+    monkeypatch.setattr(main, "JobWorker", FakeWorker)
+    monkeypatch.setattr(main, "warm_up", slow_warm_up)
+    monkeypatch.setattr(main, "prepare_search_index", lambda: None)
+    monkeypatch.setattr(main, "start_flusher", lambda: None)
+    monkeypatch.setattr("main.settings.warm_up_on_startup", True)
+    monkeypatch.setattr("main.settings.queue_worker_threads", 2)
+
+    with TestClient(main.app) as client:
+        assert client.get("/queue").status_code == 200
+        assert FakeWorker.started == []  # consumers wait for the warm-up
+        release.set()
+        assert warmed.wait(5)
+        for _ in range(100):
+            if len(FakeWorker.started) == 2:
+                break
+            threading.Event().wait(0.01)
+        assert len(FakeWorker.started) == 2
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import deque
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from core import llm_utils
+from core.resilience import Dependency
+
+DELAY = 0.05  # p95 of the seeded latency history
+
+
+class FakePrompt:
+    def format(self, **input_data):
+        return "Summarise " + input_data["text"]
+
+
+class FakeChain:
+    def __init__(self, seconds, result="text", error=None):
+        self.seconds = seconds
+        self.result = result
+        self.error = error
+        self.started = None
+        self.cancelled = False
+
+    async def ainvoke(self, input_data):
+        self.started = time.monotonic()
+        try:
+            await asyncio.sleep(self.seconds)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    dep = Dependency("llm", max_concurrency=4, tokens_per_minute=100_000)
+    monkeypatch.setattr(llm_utils, "dependency", lambda name: dep)
+    monkeypatch.setattr(llm_utils, "_histograms", {})
+    # Ten unhedged requests so far, so one hedge stays within the 50% cap
+    monkeypatch.setattr(llm_utils, "_recent_hedges", deque([False] * 10, maxlen=200))
+    monkeypatch.setattr("core.llm_utils.settings.llm_hedge_min_samples", 20)
+    monkeypatch.setattr("core.llm_utils.settings.llm_hedge_percentile", 95.0)
+    monkeypatch.setattr("core.llm_utils.settings.llm_hedge_max_rate", 0.5)
+    monkeypatch.setattr("core.llm_utils.settings.llm_hedge_model", None)
+    for _ in range(20):
+        llm_utils.latency_histogram("m").record(DELAY)
+    return dep
+
+
+def use_chains(monkeypatch, *chains):
+    queue = list(chains)
+    monkeypatch.setattr(llm_utils, "_build_chain", lambda prompt, model, base: queue.pop(0))
+    return queue
+
+
+def run():
+    return asyncio.run(llm_utils._hedged_invoke(FakePrompt(), {"text": "the ticket"}, "m"))
+
+
+def test_hedge_fires_only_after_the_percentile_delay(llm, monkeypatch):
+    unused = use_chains(monkeypatch, FakeChain(0.01, "primary"), FakeChain(0.01, "hedge"))
+    assert run() == "primary"
+    assert len(unused) == 1  # fast primary: no hedge
+
+    primary, hedge = FakeChain(0.5, "primary"), FakeChain(0.01, "hedge")
+    use_chains(monkeypatch, primary, hedge)
+    assert run() == "hedge"
+    assert hedge.started - primary.started >= DELAY * 0.9
+
+
+def test_losing_hedge_is_cancelled_and_returns_slot_and_tokens(llm, monkeypatch):
+    capacity = llm.token_budget.available
+    primary, hedge = FakeChain(0.15, "primary"), FakeChain(1.0, "hedge")
+    use_chains(monkeypatch, primary, hedge)
+    assert run() == "primary"
+    assert hedge.cancelled
+    assert llm.limiter.in_flight == 0
+    prompt_tokens = llm_utils.estimate_tokens(FakePrompt().format(text="the ticket"))
+    assert llm.token_budget.available >= capacity - prompt_tokens - 1
+
+
+def test_losing_primary_is_cancelled(llm, monkeypatch):
+    primary, hedge = FakeChain(1.0, "primary"), FakeChain(0.01, "hedge")
+    use_chains(monkeypatch, primary, hedge)
+    assert run() == "hedge"
+    assert primary.cancelled
+    assert llm.limiter.in_flight == 0
+
+
+def test_hedge_rate_is_capped(llm, monkeypatch):
+    llm_utils._recent_hedges.extend([True] * 10)  # an 11th hedge in 21 requests would exceed 50%
+    unused = use_chains(monkeypatch, FakeChain(0.2, "primary"), FakeChain(0.01, "hedge"))
+    assert run() == "primary"
+    assert len(unused) == 1
+    assert llm.limiter.in_flight == 0
+
+
+def test_primary_error_before_the_delay_propagates(llm, monkeypatch):
+    unused = use_chains(monkeypatch, FakeChain(0.01, error=ValueError("bad request")), FakeChain(0.01, "hedge"))
+    with pytest.raises(ValueError):
+        run()
+    assert len(unused) == 1
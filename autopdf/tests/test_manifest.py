@@ -0,0 +1,80 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from core.manifest import ManifestIndex, parse_object_name
+from core.wasabi_client import WasabiClient
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    index = ManifestIndex(str(tmp_path / "manifest.db"))
+    yield index
+    index.close()
+
+
+def test_parse_object_name():
+    assert parse_object_name("network/42/20240101_120000_abc.pdf") == {
+        "incident_type": "network", "incident_id": "42", "version": "20240101_120000_abc"}
+    for key in ("network/42/notes.txt", "42/20240101_120000_abc.pdf", "a/b/42/v.pdf", "digest.pdf"):
+        assert parse_object_name(key) is None
+
+
+def test_versions_are_newest_first(manifest):
+    for version in ("20240102_000000_b", "20240301_000000_c", "20240101_000000_a"):
+        assert manifest.record(f"network/42/{version}.pdf", size=10)
+    assert not manifest.record("network/42/readme.txt")
+    assert [v["version"] for v in manifest.versions(42)] == [
+        "20240301_000000_c", "20240102_000000_b", "20240101_000000_a"]
+    assert manifest.latest(42)["version"] == "20240301_000000_c"
+    assert manifest.get(42, "20240102_000000_b")["size"] == 10
+    assert manifest.latest(43) is None
+
+
+def test_rebuild_does_not_block_writers(manifest, tmp_path):
+    manifest.record("network/1/20230101_000000_old.pdf")
+    other = ManifestIndex(str(tmp_path / "manifest.db"))
+    other._conn.execute("PRAGMA busy_timeout = 100")
+
+    def listing():
+        yield {"Key": "network/2/20240101_000000_a.pdf", "Size": 5, "ETag": '"e1"'}
+        # Another process stores a version while the listing is still running
+        assert other.record("network/3/20240102_000000_b.pdf", size=7)
+        yield {"Key": "network/2/notes.txt"}
+
+    assert manifest.rebuild(listing(), batch_size=1) == 1
+    assert manifest.latest(1) is None
+    assert manifest.latest(2)["etag"] == "e1"
+    assert manifest.latest(3)["size"] == 7
+    other.close()
+
+
+@pytest.fixture
+def wasabi(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setattr("core.wasabi_client.settings.wasabi_endpoint", None)
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket="reports")
+        client = WasabiClient()
+        for key in ("network/1/20240101_000000_a.pdf", "network/2/20240101_000000_b.pdf",
+                    "printer/3/20240101_000000_c.pdf", "README.txt"):
+            client.client.put_object(Bucket="reports", Key=key, Body=b"%PDF")
+        yield client
+
+
+def test_listing_streams_objects_and_prefixes(wasabi):
+    assert sorted(wasabi.iter_prefixes("reports")) == ["network/", "printer/"]
+    assert sorted(wasabi.iter_prefixes("reports", "network/")) == ["network/1/", "network/2/"]
+    assert [obj["Key"] for obj in wasabi.iter_objects("reports")] == ["README.txt"]
+    top = list(wasabi.iter_listing("reports"))
+    assert {"Prefix": "network/"} in top and any(entry.get("Key") == "README.txt" for entry in top)
+    assert len(list(wasabi.iter_objects("reports", recursive=True))) == 4
+
+
+def test_rebuild_from_bucket_listing(wasabi, manifest):
+    assert manifest.rebuild(wasabi.iter_objects("reports", recursive=True)) == 3
+    assert manifest.latest(3)["incident_type"] == "printer"
+
+
+def test_boto_does_not_retry_behind_the_breaker(wasabi):
+    assert wasabi.client.meta.config.retries["total_max_attempts"] == 1
@@ -0,0 +1,78 @@
+import json
+import os
+import time
+
+import pytest
+
+from core import metrics
+from core.metrics import Counter, Gauge, Histogram
+
+requests_total = Counter("test_requests_total", "Requests.", ["route"])
+duration = Histogram("test_duration_seconds", "Duration.", buckets=(0.1, 1.0))
+in_flight = Gauge("test_in_flight", "In flight.")
+queued = Gauge("test_queued", "Queued.", callback=lambda: {(): 4.0}, shared=True)
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("core.metrics.settings.metrics_dir", str(tmp_path))
+    monkeypatch.setattr("core.metrics.settings.metrics_flush_interval", 5.0)
+    return tmp_path
+
+
+def write_peer(directory, name, age=0.0):
+    """Writes the snapshot of another process, as its flusher would."""
+    families = [
+        {"name": "test_requests_total", "help": "Requests.", "type": "counter", "labels": ["route"],
+         "buckets": [], "values": [[["/search"], 5.0]]},
+        {"name": "test_duration_seconds", "help": "Duration.", "type": "histogram", "labels": [],
+         "buckets": [0.1, 1.0], "values": [[[], [1, 1, 0, 0.6]]]},
+        {"name": "test_in_flight", "help": "In flight.", "type": "gauge", "labels": [],
+         "buckets": [], "values": [[[], 7.0]]},
+    ]
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(families))
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_render_sums_counters_and_histograms_across_processes(metrics_dir):
+    requests_total.inc(2, route="/search")
+    duration.observe(0.05)
+    in_flight.set(3)
+    write_peer(metrics_dir, "99999_peer")
+
+    text = metrics.render()
+    assert 'test_requests_total{route="/search"} 7.0' in text
+    assert 'test_duration_seconds_bucket{le="0.1"} 2' in text
+    assert "test_duration_seconds_count 3" in text
+    assert 'test_in_flight{pid="99999"} 7.0' in text
+    assert f'test_in_flight{{pid="{os.getpid()}"}} 3' in text
+
+
+def test_stopped_processes_keep_their_counts_but_not_their_gauges(metrics_dir):
+    write_peer(metrics_dir, "99998_gone", age=60)
+    before = metrics.render()
+    assert not (metrics_dir / "99998_gone.json").exists()
+    assert 'test_in_flight{pid="99998"}' not in before
+
+    # Folded into the archive, so the total doesn't go backwards on the next scrape
+    after = metrics.render()
+    totals = [next(line for line in text.splitlines() if line.startswith('test_requests_total{route="/search"}'))
+              for text in (before, after)]
+    assert totals[0] == totals[1]
+    assert float(totals[0].split()[-1]) >= 5.0
+
+
+def test_shared_gauges_are_reported_once_without_pid(metrics_dir):
+    metrics.flush()
+    snapshot = json.loads((metrics_dir / f"{metrics._process_id}.json").read_text())
+    assert "test_queued" not in [family["name"] for family in snapshot]
+
+    text = metrics.render()
+    assert [line for line in text.splitlines() if line.startswith("test_queued")] == ["test_queued 4.0"]
+
+
+def test_render_without_metrics_dir_serves_this_process(monkeypatch):
+    monkeypatch.setattr("core.metrics.settings.metrics_dir", "")
+    assert "# TYPE test_duration_seconds histogram" in metrics.render()
@@ -0,0 +1,79 @@
+import pytest
+
+from core import pdf_service
+from core.pdf_utils import create_pdf_from_text
+
+
+def test_warm_pool_starts_every_render_process(monkeypatch):
+    monkeypatch.setattr("core.pdf_service.settings.pdf_render_workers", 2)
+    try:
+        pdf_service.warm_pool()
+        assert len(pdf_service.get_executor()._processes) == 2
+    finally:
+        pdf_service.shutdown()
+
+
+def test_warm_pool_without_a_pool(monkeypatch):
+    monkeypatch.setattr("core.pdf_service.settings.pdf_render_workers", 0)
+    pdf_service.warm_pool()
+    assert pdf_service.get_executor() is None
+
+
+@pytest.fixture
+def inline(monkeypatch):
+    monkeypatch.setattr("core.pdf_service.settings.pdf_render_workers", 0)
+
+
+def test_render_batch_keeps_input_order(inline):
+    reports = [(f"Report body {i}", f"Title {i}") for i in range(5)]
+    assert list(pdf_service.render_batch(iter(reports))) == [create_pdf_from_text(*report) for report in reports]
+
+
+def test_digest_runs_apart_from_the_render_pool(monkeypatch):
+    monkeypatch.setattr("core.pdf_service.settings.pdf_render_workers", 2)
+    try:
+        assert pdf_service.get_digest_executor() is not pdf_service.get_executor()
+        assert pdf_service.get_digest_executor()._max_workers == 1
+    finally:
+        pdf_service.shutdown()
+
+
+def test_date_filter():
+    assert pdf_service._date_filter("2024-01-01", "2024-01-31") == "date_day >= 20240101 AND date_day <= 20240131"
+    assert pdf_service._date_filter("2024-01-01", None) == "date_day >= 20240101"
+    assert pdf_service._date_filter(None, None) == "date_day EXISTS"
+
+
+class FakeMeilisearch:
+    filters = []
+    documents = [
+        {"id": "1-v1", "incident_id": 1, "version": "v1", "name": "Old", "content": "old", "date": "2024-01-05"},
+        {"id": "1-v2", "incident_id": 1, "version": "v2", "name": "New", "content": "new", "date": "2024-01-05"},
+        {"id": "2-v1", "incident_id": 2, "version": "v1", "name": "Other", "content": "x", "date": "2024-01-09"},
+    ]
+
+    def iter_documents(self, index_name, fields=None, batch_size=500, filter=None):
+        FakeMeilisearch.filters.append(filter)
+        for doc in self.documents:
+            yield {key: doc[key] for key in fields if key in doc}
+
+
+def test_digest_cli_filters_in_meilisearch_and_keeps_latest_versions(inline, monkeypatch, tmp_path):
+    FakeMeilisearch.filters = []
+    written = []
+    monkeypatch.setattr("core.meilisearch_client.MeilisearchClient", FakeMeilisearch)
+    monkeypatch.setattr(pdf_service, "write_digest_pdf",
+                        lambda reports, path, title: written.extend(reports) or 1)
+    out = tmp_path / "digest.pdf"
+    assert pdf_service.main(["digest", "--from", "2024-01-01", "--to", "2024-01-31", "--out", str(out)]) == 0
+    assert FakeMeilisearch.filters == ["date_day >= 20240101 AND date_day <= 20240131"] * 2
+    assert [doc["id"] for doc in written] == ["1-v2", "2-v1"]
+
+
+def test_batch_cli_writes_one_pdf_per_file(inline, tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.md").write_text(f"# {name}\n\nBody")
+    out = tmp_path / "pdfs"
+    assert pdf_service.main(["batch", str(tmp_path / "a.md"), str(tmp_path / "b.md"), "--out", str(out)]) == 0
+    assert sorted(path.name for path in out.iterdir()) == ["a.pdf", "b.pdf"]
+    assert (out / "a.pdf").read_bytes().startswith(b"%PDF")
@@ -0,0 +1,24 @@
+import pytest
+
+from core.pdf_utils import _inline_markup, create_pdf_from_text
+
+
+def test_inline_markup_escapes_and_maps_emphasis():
+    assert _inline_markup("a < b & **c** *d* `e`") == (
+        'a &lt; b &amp; <b>c</b> <i>d</i> <font face="Courier">e</font>')
+
+
+@pytest.mark.parametrize("text", [
+    "**bold *it** more*",
+    "*a **b* c**",
+    "# Heading **with *crossed** markers*",
+    "- item *a **b* c**",
+])
+def test_overlapping_emphasis_still_renders(text):
+    pdf = create_pdf_from_text(f"Intro\n\n{text}\n\nOutro")
+    assert pdf.startswith(b"%PDF")
+
+
+def test_same_content_renders_to_the_same_bytes():
+    # The store stage fingerprints the PDF bytes to skip unchanged reports
+    assert create_pdf_from_text("Intro\n\n**Body**", "Report") == create_pdf_from_text("Intro\n\n**Body**", "Report")
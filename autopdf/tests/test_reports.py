@@ -0,0 +1,46 @@
+import pytest
+from botocore.exceptions import ClientError
+from fastapi.testclient import TestClient
+
+import main
+from core.blob_cache import BlobCache
+
+
+class FakeWasabi:
+    def __init__(self, code=None):
+        self.code = code
+
+    def download_to_file(self, bucket_name, object_name, file_path):
+        if self.code:
+            raise ClientError({"Error": {"Code": self.code, "Message": ""}}, "HeadObject")
+        with open(file_path, "wb") as file:
+            file.write(b"%PDF-1.4 report")
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    cache_dir = tmp_path / "blobs"
+    monkeypatch.setattr(main, "blob_cache", BlobCache(str(cache_dir)))
+    monkeypatch.setattr(main.manifest_index, "latest",
+                        lambda incident_id: {"object_name": "incident/7/v1.pdf", "version": "v1"})
+    return TestClient(main.app), cache_dir
+
+
+def use(monkeypatch, wasabi):
+    monkeypatch.setattr("core.wasabi_client.get_wasabi_client", lambda: wasabi)
+
+
+def test_stream_serves_pdf_and_drops_its_checkout(client, monkeypatch):
+    test_client, cache_dir = client
+    use(monkeypatch, FakeWasabi())
+    response = test_client.get("/reports/7", params={"stream": True})
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.4 report"
+    assert not [name for name in cache_dir.iterdir() if name.suffix == ".serving"]
+
+
+@pytest.mark.parametrize("code, status", [("404", 404), ("NoSuchKey", 404), ("AccessDenied", 502)])
+def test_stream_maps_storage_errors(client, monkeypatch, code, status):
+    test_client, _ = client
+    use(monkeypatch, FakeWasabi(code))
+    assert test_client.get("/reports/7", params={"stream": True}).status_code == status
@@ -0,0 +1,41 @@
+from core.resilience import Dependency
+
+
+def test_try_acquire_takes_slot_and_tokens_only_when_free():
+    dep = Dependency("test", max_concurrency=1, tokens_per_minute=1000)
+    assert dep.try_acquire(600)
+    assert not dep.try_acquire(100)  # no free slot
+    dep.release(0.1)
+    assert dep.limiter.in_flight == 0
+
+    assert not dep.try_acquire(600)  # only ~400 tokens left
+    assert dep.limiter.in_flight == 0  # the slot was handed back
+    dep.refund_tokens(600)
+    assert dep.try_acquire(600)
+    dep.release(None)
+    assert dep.limiter.in_flight == 0
+
+
+def test_try_acquire_skips_when_circuit_is_not_closed():
+    dep = Dependency("test", max_concurrency=4)
+    for _ in range(dep.breaker.failure_threshold):
+        dep.breaker.record_failure()
+    assert not dep.try_acquire()
+    assert dep.limiter.in_flight == 0
+
+
+def test_limit_holds_under_a_mix_of_fast_and_slow_operations():
+    dep = Dependency("test", max_concurrency=16)
+    for _ in range(100):
+        for latency, operation in ((0.02, "head_object"), (0.02, "head_object"), (0.3, "download_file")):
+            dep.limiter.acquire()
+            dep.limiter.release(latency, operation=operation)
+    assert dep.limiter.limit == 16
+
+
+def test_limit_shrinks_when_one_operation_slows_down():
+    dep = Dependency("test", max_concurrency=16)
+    for latency in [0.02] * 10 + [0.2] * 10:
+        dep.limiter.acquire()
+        dep.limiter.release(latency, operation="head_object")
+    assert dep.limiter.limit < 16
@@ -0,0 +1,51 @@
+import meilisearch
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+class FakeMeilisearch:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def search_page(self, index_name, query, filter, facets, fields, offset, limit):
+        self.calls.append("search_page")
+        if self.error:
+            raise self.error
+        return {"hits": [{"incident_id": 1}], "estimatedTotalHits": 1, "facetDistribution": {}}
+
+    def ensure_filterable(self, index_name, attributes):
+        self.calls.append("ensure_filterable")
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr("core.search_cache.settings.search_cache_ttl", 0)
+    monkeypatch.setattr("core.search_cache.settings.search_generation_path", str(tmp_path / "generation"))
+    main.get_search_cache.cache_clear()
+    yield TestClient(main.app)
+    main.get_search_cache.cache_clear()
+
+
+def use(monkeypatch, fake):
+    monkeypatch.setattr("core.meilisearch_client.get_meilisearch_client", lambda: fake)
+
+
+def test_search_only_searches(client, monkeypatch):
+    fake = FakeMeilisearch()
+    use(monkeypatch, fake)
+    response = client.get("/search", params={"q": "disk", "status": "closed"})
+    assert response.status_code == 200
+    assert response.json()["hits"] == [{"incident_id": 1}]
+    assert fake.calls == ["search_page"]
+
+
+@pytest.mark.parametrize("error", [
+    meilisearch.errors.MeilisearchCommunicationError("connection refused"),
+    meilisearch.errors.MeilisearchTimeoutError("timed out"),
+])
+def test_unreachable_meilisearch_is_503(client, monkeypatch, error):
+    use(monkeypatch, FakeMeilisearch(error))
+    assert client.get("/search", params={"q": "disk"}).status_code == 503
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core import search_index
+
+
+class FakeMeilisearch:
+    def __init__(self, calls, documents=None):
+        self.calls = calls
+        self.documents = documents or {}
+
+    def get_document(self, index_name, doc_id):
+        return self.documents.get(doc_id)
+
+    def update_document(self, index_name, document):
+        self.calls.append(("update", document))
+        return SimpleNamespace(task_uid=7)
+
+    def wait_for_task(self, task, timeout):
+        self.calls.append(("wait", task.task_uid))
+        return True
+
+
+class FakeCache:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def invalidate(self):
+        self.calls.append(("invalidate",))
+
+
+class FakeManifest:
+    def latest(self, incident_id):
+        return {"version": "20240101_000000_abc"} if incident_id == 1 else None
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(search_index, "get_search_cache", lambda: FakeCache(calls))
+    monkeypatch.setattr(search_index, "get_manifest_index", lambda: FakeManifest())
+    return calls
+
+
+def use(monkeypatch, client):
+    monkeypatch.setattr(search_index, "get_meilisearch_client", lambda: client)
+
+
+def test_publish_invalidates_only_after_the_task_is_applied(calls, monkeypatch):
+    use(monkeypatch, FakeMeilisearch(calls))
+    search_index.publish(SimpleNamespace(task_uid=3))
+    assert calls == [("wait", 3), ("invalidate",)]
+
+
+def test_sync_status_updates_the_latest_version(calls, monkeypatch):
+    doc_id = "1-20240101_000000_abc"
+    use(monkeypatch, FakeMeilisearch(calls, {doc_id: {"id": doc_id, "status": "Solved"}}))
+    assert search_index.sync_status(1, "Closed")
+    assert calls == [("update", {"id": doc_id, "status": "Closed"}), ("wait", 7), ("invalidate",)]
+
+
+def test_sync_status_skips_unchanged_or_unknown(calls, monkeypatch):
+    doc_id = "1-20240101_000000_abc"
+    use(monkeypatch, FakeMeilisearch(calls, {doc_id: {"id": doc_id, "status": "Closed"}}))
+    assert not search_index.sync_status(1, "Closed")
+    assert not search_index.sync_status(2, "Closed")
+    assert calls == []
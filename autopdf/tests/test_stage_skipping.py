@@ -0,0 +1,65 @@
+import sys
+from types import ModuleType
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from agents import data_processor, query_handler
+from core.fingerprints import FingerprintStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = FingerprintStore(str(tmp_path / "fingerprints.db"))
+    monkeypatch.setattr(data_processor, "get_fingerprint_store", lambda: store)
+    monkeypatch.setattr(query_handler, "get_fingerprint_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def partitions(monkeypatch):
+    calls = []
+    module = ModuleType("unstructured.partition.auto")
+    module.partition = lambda file: calls.append(file.read()) or ["Extracted text"]
+    monkeypatch.setitem(sys.modules, "unstructured.partition.auto", module)
+    return calls
+
+
+@pytest.fixture
+def rag(monkeypatch):
+    calls = []
+
+    class FakeRag:
+        def invoke(self, inputs):
+            calls.append(inputs)
+            return {"generated_content": f"Summary of {inputs['processed_data']['solution']}"}
+
+    monkeypatch.setattr(query_handler, "get_rag_app", lambda: FakeRag())
+    return calls
+
+
+def processed(solution):
+    return {"incident_id": 7, "name": "Printer", "content": "Jammed", "solution": solution, "tasks": [],
+            "document_content": "Extracted text", "incident_type": "Printer Issue"}
+
+
+def test_same_document_is_partitioned_once(store, partitions):
+    processor = data_processor.DataProcessorAgent()
+    assert processor.extract_text_from_document_content(repr(b"%PDF attachment")) == "Extracted text"
+    assert processor.extract_text_from_document_content(repr(b"%PDF attachment")) == "Extracted text"
+    assert len(partitions) == 1
+
+
+def test_changed_solution_regenerates_but_reuses_partition_text(store, partitions, rag):
+    processor = data_processor.DataProcessorAgent()
+    handler = query_handler.QueryHandlerAgent()
+    processor.extract_text_from_document_content(repr(b"%PDF attachment"))
+    assert handler.run_rag(processed("Restarted")) == "Summary of Restarted"
+    assert handler.run_rag(processed("Restarted")) == "Summary of Restarted"
+    assert len(rag) == 1
+
+    processor.extract_text_from_document_content(repr(b"%PDF attachment"))
+    assert handler.run_rag(processed("Replaced the drum")) == "Summary of Replaced the drum"
+    assert len(rag) == 2
+    assert len(partitions) == 1
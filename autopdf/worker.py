@@ -0,0 +1,23 @@
+"""Standalone queue consumer: run `python worker.py` next to (or instead of) the API.
+
+Every process started this way pulls incident jobs from the shared SQLite job
+store, so throughput scales with the number of processes on the host.
+"""
+from core.config import settings
+from core.job_queue import JobQueue, JobWorker
+from core.metrics import start_flusher
+from main import process_job, warm_up
+
+
+if __name__ == "__main__":
+    start_flusher()
+    if settings.warm_up_on_startup:
+        warm_up()
+    worker = JobWorker(JobQueue(), process_job, poll_interval=settings.queue_poll_interval)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(timeout=1)
+    except KeyboardInterrupt:
+        worker.stop()
+        worker.join()